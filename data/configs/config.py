@@ -1,14 +1,52 @@
+# пропуск классификации кадров без изменений (неподвижные камеры): результаты копируются с последнего
+# классифицированного кадра камеры, пока уменьшенная копия кадра отличается меньше threshold
+SceneGate = dict(
+    turn_on=False,
+    module="msc.block.gating.SceneGate",
+    # сторона уменьшенной копии кадра
+    signature_size=32,
+    # среднее абсолютное отличие пикселей (0..255)
+    threshold=2.0,
+    # принудительная классификация не реже чем раз в max_age_frames кадров
+    max_age_frames=25,
+)
+
 ImagenetClassifier = dict(
     turn_on=True,
     module="msc.block.classifiers.TorchClassifier",
+    # бэкенд модели: "TorchClassifier" или "OnnxClassifier" (onnxruntime, только fp32)
     type="TorchClassifier",
     input_size=224,
-    fp16_mode=True,
+    # точность: "fp32", "fp16" (gpu), "bf16" (autocast), "int8_dynamic" (cpu), "int8_static" (cpu, калибровка)
+    # None - fp16 на gpu при fp16_mode=True, иначе fp32
+    precision="fp32",
+    # каталог изображений для калибровки int8_static и их кол-во
+    calibration_dir=None,
+    calibration_size=100,
     threshold=0.5,
+    # кол-во лучших предсказаний на изображение (отфильтрованных по threshold)
+    top_k=1,
+
+    # устройство: "cpu", "cuda" или None - выбирается по --gpu_id (-1 - cpu)
+    device=None,
+    # параметры cpu режима. None - значения torch по-умолчанию
+    num_threads=None,
+    num_interop_threads=None,
+    channels_last=None,
+    # каталог кэша скомпилированных (trace + freeze) моделей. None - кэш отключен
+    compiled_cache_dir=None,
 
     # модели из зоопарка модуля pretrainedmodels
     model_name="resnext101_32x4d",
+    # локальные веса (state dict). None - веса imagenet из pretrainedmodels
+    checkpoint_path=None,
+    # метки классов. None - labels.txt рядом с checkpoint_path (или метки imagenet)
+    labels_path=None,
+    # размер батча модели: изображения всех контейнеров (--input_batch_size) собираются в батчи этого размера
     batch_size=1,
+    # кэш результатов (sqlite, LRU) по содержимому изображения и параметрам модели. None - кэш отключен
+    result_cache_path=None,
+    result_cache_size_mb=512,
 )
 
 Visualizator = dict(
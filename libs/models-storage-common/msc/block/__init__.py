@@ -1,8 +1,13 @@
+from msc.utils import lazy_getattr
 from .base_block import BaseBlock
 
-from .classifiers import TorchClassifier
+# блоки импортируются только при обращении (Runner загружает только включенные блоки)
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "TorchClassifier": "msc.block.classifiers.torch_classifier.TorchClassifier",
+        "SceneGate": "msc.block.gating.scene_gate.SceneGate",
+    },
+)
 
-__all__ = [
-    BaseBlock,
-    TorchClassifier
-]
+__all__ = [BaseBlock]
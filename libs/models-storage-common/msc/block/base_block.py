@@ -36,6 +36,27 @@ class BaseBlock(abc.ABC):
     def __call__(self, containers: List) -> List:
         pass
 
+    def preprocess(self, containers: List) -> List:
+        """CPU-side preparation which does not depend on previous blocks.
+
+        In the pipelined mode it runs ahead in several threads, so it must be thread-safe and must not change state used
+        by __call__ (reading it under a lock is allowed). __call__ of all blocks always runs in one thread in the order
+        of frames.
+        """
+        return containers
+
+    def decode_size(self) -> Union[int, None]:
+        """Minimal longer side of input images the block needs. None - the block has no requirements."""
+        return None
+
+    def mutates_image(self) -> bool:
+        """Whether the block draws on container.image in place. Then draw buffers must be copied before the pipeline."""
+        return False
+
+    def close(self) -> None:
+        """Releases resources held by the block (shared models etc.)."""
+        pass
+
     def get_input(self, container: List, default: str = "default") -> Any:
         """
             Принимает на вход имя аттрибута и проверяет его наличие в контейнере. Если аттрибут отсутствует возвращает
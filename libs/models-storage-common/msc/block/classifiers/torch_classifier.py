@@ -1,49 +1,195 @@
+import json
 import logging
 import time
-from typing import List
+from typing import Dict, List, Tuple, Union
 
 import cv2
+import numpy as np
 
+from msc.__version__ import __version__
 from msc.block import BaseBlock
+from msc.block.gating.scene_gate import SCENE_GATE_HINT_KEY, SCENE_GATE_SOURCE_KEY
 from msc.models import ModelProvider
-from vuka.core import ClassificationObject
+from msc.models.classifiers.preprocessing import letterbox_resize
+from msc.utils import file_fingerprint
+from msc.utils.result_cache import ResultCache
+from vuka.core import ClassificationBatch
 from vuka.utils import Config
 
+# ключ подготовленного изображения в container.extra
+PREPARED_INPUT_KEY = "torch_classifier_input"
+# ключ результатов блока в container.extra: (ClassificationBatch, index), переиспользуются для кадров без изменений
+PREDICTIONS_KEY = "torch_classifier_predictions"
+# формат значений кэша результатов: [(label_id, score)]
+RESULT_CACHE_FORMAT = 2
+
+# параметры, не влияющие на результат классификации
+CACHE_IGNORED_KEYS = (
+    "turn_on",
+    "module",
+    "data",
+    "batch_size",
+    "num_threads",
+    "num_interop_threads",
+    "compiled_cache_dir",
+    "shared_model",
+    "result_cache_path",
+    "result_cache_size_mb",
+)
+
 
 class TorchClassifier(BaseBlock):
     def __init__(self, config: Config = None) -> None:
         super().__init__(config)
         self._cfg: Config = config
 
+        # кэш результатов по содержимому изображения. None - кэш отключен
+        self.result_cache = None
         if self._cfg.turn_on:
             try:
                 self.model = ModelProvider.get_model(self._cfg)
             except Exception as e:
                 raise Exception(e)
 
+            if self._cfg.get("result_cache_path") is not None:
+                self.result_cache = ResultCache(
+                    self._cfg.result_cache_path,
+                    max_size_mb=self._cfg.get("result_cache_size_mb") or 512,
+                    fingerprint=self.cache_fingerprint(),
+                )
+
+    def close(self) -> None:
+        if self._cfg.turn_on and hasattr(self.model, "release"):
+            self.model.release()
+        if self.result_cache is not None:
+            self.result_cache.close()
+            self.result_cache = None
+
+    def cache_fingerprint(self) -> str:
+        """Fingerprint of the model and the post-processing params, part of every result cache key."""
+        params = {k: v for k, v in self._cfg.items() if k not in CACHE_IGNORED_KEYS}
+        for key in ("checkpoint_path", "labels_path"):
+            if self._cfg.get(key) is not None:
+                params[key] = file_fingerprint(self._cfg.get(key))
+        params["msc_version"] = __version__
+        params["result_format"] = RESULT_CACHE_FORMAT
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def add_predictions(self, container, batch: ClassificationBatch, index: int) -> None:
+        container.extra[(PREDICTIONS_KEY, id(self))] = (batch, index)
+        container.add_classification(batch, index)
+
+    def classify(
+        self, batch_data: List[np.ndarray], rows: List[int], size: int, cached: Dict[int, List[Tuple[int, float]]]
+    ) -> ClassificationBatch:
+        """Runs the model on batch_data and builds the results of size containers.
+
+        Args:
+            batch_data: images of the containers rows.
+            rows: container index of each image.
+            size: number of containers.
+            cached: results of the containers found in the result cache, {index: [(label_id, score)]}.
+        """
+        batch_size = max(1, int(self._cfg.get("batch_size") or 1))
+        outputs = [
+            self.model.predict_top_k(batch_data[i : i + batch_size]) for i in range(0, len(batch_data), batch_size)
+        ]
+        if len(outputs) > 0:
+            top_scores, top_ids, keep = (np.concatenate(arrays) for arrays in zip(*outputs))
+        else:
+            top_scores, top_ids, keep = np.empty((0, 0), np.float32), np.empty((0, 0), np.int64), np.empty((0, 0), bool)
+        return ClassificationBatch.from_top_k(
+            top_scores, top_ids, keep, self.model.labels, rows=rows, size=size, predictions=cached
+        )
+
+    def decode_size(self) -> Union[int, None]:
+        # изображения вписываются в input_size x input_size
+        if self._cfg.turn_on and self.input is None:
+            return self._cfg.get("input_size")
+        return None
+
+    def prepare_input(self, container) -> Union[np.ndarray, None]:
+        """Returns the container image resized to the letterbox geometry of input_size and converted to a 3-channel
+        image, or None if it can not be classified. The model only copies it into the batch.
+        """
+        data = self.get_input(container=container, default="image")
+        if data is None:
+            return None
+
+        h, w = data.shape[:2]
+        if h < 3 or w < 3:
+            return None
+
+        # multidimensional image
+        if data.ndim == 3 and data.shape[2] > 3:
+            logging.warning(f"data channels > 3! Maybe you need change data or use pretrained NN for multidim")
+            data = data[:, :, :3].copy()
+
+        data = letterbox_resize(data, int(self._cfg.input_size))
+
+        # grayscale image, converted after the resize
+        if data.ndim == 2:
+            t1 = time.time()
+            data = cv2.cvtColor(data, cv2.COLOR_GRAY2RGB)
+            t2 = time.time()
+            logging.debug(f"gray_to_rgb >>> {t2 - t1}")
+        return data
+
+    def preprocess(self, containers: List) -> List:
+        # input from another block's output is not ready before the pipeline runs
+        if self._cfg.turn_on and self.input is None:
+            for container in containers:
+                # кадр, вероятно, переиспользует результаты (SceneGate): вход готовится в __call__ только при промахе
+                if container.extra.get(SCENE_GATE_HINT_KEY):
+                    continue
+                container.extra[(PREPARED_INPUT_KEY, id(self))] = self.prepare_input(container)
+        return containers
+
     @BaseBlock.logger
     def __call__(self, containers: List) -> List:
         if self._cfg.turn_on:
-            for container in containers:
-                data = self.get_input(container=container, default="image")
-                if data is not None:
-                    h, w = data.shape[:2]
-                    if h < 3 or w < 3:
+            batch_rows, batch_data, batch_keys, gated = [], [], [], []
+            cached = dict()
+            for index, container in enumerate(containers):
+                key = (PREPARED_INPUT_KEY, id(self))
+                # кадр не изменился с последнего классифицированного кадра камеры (SceneGate)
+                source = container.extra.get(SCENE_GATE_SOURCE_KEY)
+                if source is not None and source is not container:
+                    container.extra.pop(key, None)
+                    gated.append((container, source))
+                    continue
+
+                if key in container.extra:
+                    data = container.extra.pop(key)
+                else:
+                    data = self.prepare_input(container)
+                if data is None:
+                    continue
+
+                cache_key = None
+                if self.result_cache is not None:
+                    cache_key = self.result_cache.key(data)
+                    predictions = self.result_cache.get(cache_key)
+                    if predictions is not None:
+                        cached[index] = predictions
                         continue
 
-                    # grayscale image
-                    if data.ndim == 2:
-                        t1 = time.time()
-                        data = cv2.cvtColor(data, cv2.COLOR_GRAY2RGB)
-                        t2 = time.time()
-                        logging.error(f"gray_to_rgb >>> {t2 - t1}")
-                    # multidimensional image
-                    elif data.ndim > 3:
-                        logging.warning(f"data ndim > 3! Maybe you need change data or use pretrained NN for multidim")
-                        data = data[:, :, :3].copy()
-
-                    scores, labels = self.model.predict(data)
-                    for score, label in zip(scores, labels):
-                        classification_obj = ClassificationObject(score=float(score), label=label)
-                        container.add_obj(classification_obj)
+                batch_rows.append(index)
+                batch_data.append(data)
+                batch_keys.append(cache_key)
+
+            if len(batch_rows) > 0 or len(cached) > 0:
+                # один columnar результат на все контейнеры вызова, объекты создаются только по запросу
+                batch = self.classify(batch_data, batch_rows, len(containers), cached)
+                for index, cache_key in zip(batch_rows, batch_keys):
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, batch.predictions(index))
+                for index in sorted(batch_rows + list(cached)):
+                    self.add_predictions(containers[index], batch, index)
+
+            # источник может быть в этом же батче, поэтому копирование после инференса
+            for container, source in gated:
+                predictions = source.extra.get((PREDICTIONS_KEY, id(self)))
+                if predictions is not None:
+                    self.add_predictions(container, *predictions)
         return containers
@@ -0,0 +1,3 @@
+from .scene_gate import SceneGate
+
+__all__ = [SceneGate]
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+import logging
+import threading
+from typing import List, Union
+
+import cv2
+import numpy as np
+
+from msc.block import BaseBlock
+from vuka.utils import Config
+
+# ключ в container.extra: контейнер, результаты которого переиспользуются
+SCENE_GATE_SOURCE_KEY = "scene_gate_source"
+# ключ в container.extra: кадр, вероятно, будет переиспользован (preprocess), его вход можно не готовить заранее
+SCENE_GATE_HINT_KEY = "scene_gate_hint"
+# ключ сигнатуры кадра, посчитанной в preprocess
+SIGNATURE_KEY = "scene_gate_signature"
+
+
+class CameraState:
+    def __init__(self, signature: np.ndarray, container) -> None:
+        self.signature = signature
+        # последний кадр камеры, отправленный на классификацию
+        self.container = container
+        self.age = 0
+
+
+class SceneGate(BaseBlock):
+    """Skips the classification of frames which did not change since the last classified frame of the camera.
+
+    The signature of a frame is its downsampled grayscale copy. If the mean absolute difference with the signature
+    of the last classified frame of the same camera is below threshold, the frame is marked with the classified
+    container (container.extra[SCENE_GATE_SOURCE_KEY]) and classifiers copy its results instead of inference.
+    Every max_age_frames frames the camera is classified anyway.
+
+    In the pipelined mode preprocess computes the signatures ahead and predicts the decision with a separate state
+    updated by the same rules in the order of preprocessing. Frames which will likely reuse results get
+    container.extra[SCENE_GATE_HINT_KEY], classifiers do not prepare their input ahead. The hint is only an
+    optimization, the decision is made by __call__ in the order of frames.
+
+    Inputs without a camera id share the default camera "0", so the state is kept per camera and source of the frame
+    (container.file_name: video path, image file). Frames of different videos or images never reuse results of each
+    other, interleaved sources keep their own state. At most max_states least recently used states are kept.
+
+    Config:
+        signature_size: side of the downsampled signature.
+        threshold: mean absolute pixel difference (0..255) below which the frame is considered unchanged.
+        max_age_frames: max number of frames in a row which reuse results.
+        max_states: max number of kept camera/source states.
+    """
+
+    def __init__(self, config: Config = None) -> None:
+        super().__init__(config)
+        self._cfg: Config = config
+        self.signature_size = int(self._cfg.get("signature_size") or 32)
+        self.threshold = float(self._cfg.get("threshold") or 2.0)
+        self.max_age_frames = int(self._cfg.get("max_age_frames") or 25)
+        self.max_states = int(self._cfg.get("max_states") or 256)
+
+        self.cameras = OrderedDict()
+        # состояние камер в порядке preprocess, только для подсказок
+        self.predicted = OrderedDict()
+        self.frames = 0
+        self.gated = 0
+        self._lock = threading.Lock()
+
+    def signature(self, image: np.ndarray) -> np.ndarray:
+        small = cv2.resize(image, (self.signature_size, self.signature_size), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small[:, :, :3], cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def container_signature(self, container) -> Union[np.ndarray, None]:
+        image = self.get_input(container=container, default="image")
+        if image is None or image.shape[0] < 1 or image.shape[1] < 1:
+            return None
+        return self.signature(image)
+
+    @staticmethod
+    def state_key(container) -> tuple:
+        return container.camera_id, container.file_name
+
+    def lookup(self, states: OrderedDict, container) -> Union[CameraState, None]:
+        state = states.get(self.state_key(container))
+        if state is not None:
+            states.move_to_end(self.state_key(container))
+        return state
+
+    def store(self, states: OrderedDict, signature: np.ndarray, container) -> None:
+        states[self.state_key(container)] = CameraState(signature, container)
+        states.move_to_end(self.state_key(container))
+        # каталог изображений дает новый источник на каждый кадр, старые состояния вытесняются
+        while len(states) > self.max_states:
+            states.popitem(last=False)
+
+    def unchanged(self, state: Union[CameraState, None], container, signature: np.ndarray) -> bool:
+        return (
+            state is not None
+            and state.age < self.max_age_frames
+            and float(np.abs(signature - state.signature).mean()) < self.threshold
+        )
+
+    def gate(self, container) -> Union[object, None]:
+        """Returns the container whose results can be reused or None if the frame should be classified."""
+        key = (SIGNATURE_KEY, id(self))
+        if key in container.extra:
+            signature = container.extra.pop(key)
+        else:
+            signature = self.container_signature(container)
+        if signature is None:
+            return None
+
+        with self._lock:
+            self.frames += 1
+            state = self.lookup(self.cameras, container)
+            if self.unchanged(state, container, signature):
+                state.age += 1
+                self.gated += 1
+                return state.container
+
+            self.store(self.cameras, signature, container)
+        return None
+
+    def preprocess(self, containers: List) -> List:
+        if self._cfg.turn_on and self.input is None:
+            for container in containers:
+                signature = self.container_signature(container)
+                container.extra[(SIGNATURE_KEY, id(self))] = signature
+                if signature is None:
+                    continue
+                # решение принимает __call__ в порядке кадров, здесь оно только предсказывается
+                with self._lock:
+                    state = self.lookup(self.predicted, container)
+                    hint = self.unchanged(state, container, signature)
+                    if hint:
+                        state.age += 1
+                    else:
+                        self.store(self.predicted, signature, container)
+                container.extra[SCENE_GATE_HINT_KEY] = hint
+        return containers
+
+    @BaseBlock.logger
+    def __call__(self, containers: List) -> List:
+        if self._cfg.turn_on:
+            for container in containers:
+                source = self.gate(container)
+                if source is not None:
+                    container.extra[SCENE_GATE_SOURCE_KEY] = source
+        return containers
+
+    def close(self) -> None:
+        if self.frames > 0:
+            logging.info(
+                f"scene gate: {self.gated} of {self.frames} frames reused results "
+                f"({100 * self.gated / self.frames:.1f}%), cameras={len(self.cameras)}"
+            )
+        self.cameras = OrderedDict()
+        self.predicted = OrderedDict()
@@ -19,12 +19,20 @@ class Visualizator(BaseBlock):
     def draw_caption(self, image: np.ndarray, caption: str) -> None:
         cv2.putText(image, caption, (50, 50), cv2.FONT_HERSHEY_PLAIN, self.font_size, self.color, self.thickness, )
 
+    def mutates_image(self) -> bool:
+        # подписи рисуются прямо на container.image
+        return bool(self._cfg.turn_on)
+
     @BaseBlock.logger
     def __call__(self, containers: List) -> List:
         if self._cfg.turn_on:
             for container in containers:
                 if container.image is not None:
-                    objects = get_classification_objects(container.objects)
+                    objects = get_classification_objects(container.materialized_objects)
                     for obj in objects:
                         self.draw_caption(image=container.image, caption=f"{obj.label}")
+                    # результаты классификаторов читаются из batch без создания объектов
+                    for batch, index in container.pending_classifications:
+                        for label in batch.label_names(index):
+                            self.draw_caption(image=container.image, caption=f"{label}")
         return containers
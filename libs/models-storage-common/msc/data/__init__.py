@@ -1,3 +1,4 @@
 from .imagenet_labels import imagenet_labels
+from .labels import checkpoint_labels_path, load_label_table, load_labels
 
-__all__ = [imagenet_labels]
+__all__ = [imagenet_labels, load_labels, load_label_table, checkpoint_labels_path]
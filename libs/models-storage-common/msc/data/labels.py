@@ -0,0 +1,58 @@
+import codecs
+import json
+from pathlib import Path
+import threading
+from typing import Dict, Union
+
+from msc.data.imagenet_labels import imagenet_labels
+from vuka.core.label_table import LabelTable
+
+DEFAULT_LABELS_FILE = "labels.txt"
+
+# таблицы меток процесса: (путь, mtime) -> LabelTable, None - imagenet
+_label_tables: Dict = dict()
+_label_tables_lock = threading.Lock()
+
+
+def load_labels(path: Union[str, Path]) -> Dict[int, str]:
+    """Loads the {label_id: name} mapping.
+
+    Args:
+        path: txt file with one name per line (line number is the label id) or json file with a list of names
+            or a {label_id: name} dict.
+
+    Returns:
+        {label_id: name}
+    """
+    path = Path(path)
+    if not path.exists():
+        raise Exception(f"labels file <{path}> is not exists!")
+
+    with codecs.open(str(path), "r", "utf8") as f:
+        if path.suffix.lower() == ".json":
+            data = json.load(f)
+            if isinstance(data, dict):
+                return {int(k): str(v) for k, v in data.items()}
+            return {i: str(v) for i, v in enumerate(data)}
+        names = [line.strip() for line in f.readlines() if len(line.strip()) > 0]
+        return dict(enumerate(names))
+
+
+def checkpoint_labels_path(checkpoint_path: Union[str, Path]) -> Path:
+    """Default labels file is placed next to the checkpoint."""
+    return Path(checkpoint_path).parent / DEFAULT_LABELS_FILE
+
+
+def load_label_table(path: Union[str, Path, None] = None) -> LabelTable:
+    """Shared LabelTable of the labels file (imagenet labels if path is None), loaded once per process."""
+    key = None
+    if path is not None:
+        path = Path(path).resolve()
+        key = (str(path), path.stat().st_mtime_ns if path.exists() else None)
+
+    with _label_tables_lock:
+        table = _label_tables.get(key)
+        if table is None:
+            table = LabelTable.from_mapping(imagenet_labels if path is None else load_labels(path))
+            _label_tables[key] = table
+    return table
@@ -1,7 +1,14 @@
-from msc.utils import import_classmodule
+from msc.utils import lazy_getattr
 from .model_provider import ModelProvider
+from .model_registry import ModelHandle, ModelRegistry
 
-# зависмые от архитектуры модули импортируем мягким способом
-TorchClassifier = import_classmodule("msc.models.classifiers.TorchClassifier")
+# зависимые от архитектуры модули (torch, onnxruntime) импортируем при первом обращении
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "TorchClassifier": "msc.models.classifiers.torch_classifier.TorchClassifier",
+        "OnnxClassifier": "msc.models.classifiers.onnx_classifier.OnnxClassifier",
+    },
+)
 
-__all__ = [ModelProvider, TorchClassifier]
+__all__ = [ModelProvider, ModelRegistry, ModelHandle]
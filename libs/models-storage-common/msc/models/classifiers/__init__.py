@@ -1,3 +1,10 @@
-from .torch_classifier import TorchClassifier
+from msc.utils import lazy_getattr
 
-__all__ = [TorchClassifier]
+# бэкенды зависят от опциональных пакетов, поэтому импортируем при первом обращении
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "TorchClassifier": "msc.models.classifiers.torch_classifier.TorchClassifier",
+        "OnnxClassifier": "msc.models.classifiers.onnx_classifier.OnnxClassifier",
+    },
+)
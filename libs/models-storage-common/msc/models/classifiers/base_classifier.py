@@ -1,4 +1,10 @@
 from abc import ABC, abstractmethod
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from msc.data import checkpoint_labels_path, load_label_table
+from vuka.core import LabelTable
 
 
 class BaseClassifier(ABC):
@@ -10,9 +16,80 @@ class BaseClassifier(ABC):
         pass
 
     @abstractmethod
-    def predict_on_batch(self, batch):
+    def predict_top_k_on_batch(self, batch, threshold=None, top_k=None):
+        """Returns (N, k) arrays: top_scores sorted in descending order, label ids and the threshold keep mask."""
         pass
 
-    @abstractmethod
-    def predict(self, img):
-        pass
+    def predict_on_batch(self, batch, threshold=None, top_k=None):
+        top_scores, top_ids, keep = self.predict_top_k_on_batch(batch, threshold=threshold, top_k=top_k)
+        return self.split_predictions(top_scores, self.label_names[top_ids], keep)
+
+    def memory_bytes(self) -> Union[int, None]:
+        """Memory held by the model weights, None if unknown."""
+        return None
+
+    def predict(self, input: Union[List[np.ndarray], np.ndarray], threshold=None, top_k=None):
+        """Splits input into batches of self.batch_size and runs predict_on_batch on them.
+
+        Args:
+            input: image or list of images.
+            threshold: score threshold, None - self.threshold.
+            top_k: number of top predictions, None - self.top_k.
+
+        Returns:
+            scores, labels - per image arrays of top_k predictions with score >= threshold
+        """
+        if not isinstance(input, list):
+            input = [input]
+
+        scores, labels = [], []
+        for i in range(0, len(input), self.batch_size):
+            batch_scores, batch_labels = self.predict_on_batch(
+                input[i : i + self.batch_size], threshold=threshold, top_k=top_k
+            )
+            scores.extend(batch_scores)
+            labels.extend(batch_labels)
+
+        return scores, labels
+
+    def predict_top_k(
+        self, input: Union[List[np.ndarray], np.ndarray], threshold=None, top_k=None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The same as predict, but returns (N, k) top_scores, label ids and keep mask arrays for all images."""
+        if not isinstance(input, list):
+            input = [input]
+
+        results = [
+            self.predict_top_k_on_batch(input[i : i + self.batch_size], threshold=threshold, top_k=top_k)
+            for i in range(0, len(input), self.batch_size)
+        ]
+        top_scores, top_ids, keep = zip(*results)
+        return np.concatenate(top_scores), np.concatenate(top_ids), np.concatenate(keep)
+
+    @staticmethod
+    def load_labels(checkpoint_path: Union[str, None], labels_path: Union[str, None]) -> LabelTable:
+        """Labels of a local checkpoint are read from labels_path or from labels.txt next to the checkpoint.
+
+        The table is shared by all models with the same labels file, imagenet labels are used without a checkpoint.
+        """
+        if labels_path is None and checkpoint_path is not None:
+            labels_path = checkpoint_labels_path(checkpoint_path)
+        return load_label_table(labels_path)
+
+    @staticmethod
+    def split_predictions(
+        top_scores: np.ndarray, top_names: np.ndarray, keep: np.ndarray
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Splits (N, k) top-k arrays into per-image predictions that passed the threshold.
+
+        Args:
+            top_scores: (N, k) scores sorted in descending order.
+            top_names: (N, k) label names.
+            keep: (N, k) boolean mask of predictions to keep.
+
+        Returns:
+            scores, labels - lists of N arrays
+        """
+        scores = [row_scores[row_keep] for row_scores, row_keep in zip(top_scores, keep)]
+        labels = [row_names[row_keep] for row_names, row_keep in zip(top_names, keep)]
+        return scores, labels
@@ -0,0 +1,60 @@
+import inspect
+import logging
+from pathlib import Path
+import pickle
+import time
+from typing import Dict, Union
+import zipfile
+
+import torch
+from torch import nn
+
+
+def load_state_dict(path: Union[str, Path]) -> Dict[str, torch.Tensor]:
+    """Loads a local state dict. Zip checkpoints are memory-mapped where torch supports it (torch>=2.1),
+    so processes on one host share the weight pages through the page cache.
+
+    The file is loaded with weights_only=True first. Training checkpoints with optimizer state, argparse namespaces
+    and other objects are rejected by it and are loaded again with weights_only=False (trusted local files only).
+    """
+    load_kwargs = {"map_location": "cpu"}
+    parameters = inspect.signature(torch.load).parameters
+    # legacy (non-zip) checkpoints can not be memory-mapped
+    if "mmap" in parameters and zipfile.is_zipfile(str(path)):
+        load_kwargs["mmap"] = True
+    if "weights_only" in parameters:
+        load_kwargs["weights_only"] = True
+
+    t1 = time.time()
+    try:
+        state = torch.load(str(path), **load_kwargs)
+    except pickle.UnpicklingError:
+        if not load_kwargs.get("weights_only"):
+            raise
+        logging.warning(f"checkpoint <{path}> has objects other than weights, it is loaded with weights_only=False")
+        load_kwargs["weights_only"] = False
+        state = torch.load(str(path), **load_kwargs)
+    t2 = time.time()
+    logging.info(
+        f"checkpoint <{path}> loaded in {t2 - t1:.2f}s, mmap={load_kwargs.get('mmap', False)}, "
+        f"weights_only={load_kwargs.get('weights_only', False)}"
+    )
+
+    # training checkpoints keep weights under a key
+    for key in ("state_dict", "model"):
+        if isinstance(state, dict) and isinstance(state.get(key), dict):
+            state = state[key]
+
+    # DataParallel prefix
+    return {k[len("module.") :] if k.startswith("module.") else k: v for k, v in state.items()}
+
+
+def assign_state_dict(model: nn.Module, state: Dict[str, torch.Tensor]) -> nn.Module:
+    """Loads state into model. With assign=True (torch>=2.1) the parameters reuse the loaded
+    (memory-mapped) tensors instead of copying them.
+    """
+    if "assign" in inspect.signature(model.load_state_dict).parameters:
+        model.load_state_dict(state, assign=True)
+    else:
+        model.load_state_dict(state)
+    return model
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Dict, Union
+
+import torch
+
+from msc.utils import atomic_write
+
+META_FILE = "msc_meta.json"
+
+
+def compiled_cache_key(**fields) -> Dict:
+    """Builds the key of a compiled artifact. The torch version is always a part of the key."""
+    key = dict(fields)
+    key["torch"] = torch.__version__
+    return key
+
+
+def compiled_cache_path(cache_dir: Union[str, Path], key: Dict) -> Path:
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf8")).hexdigest()[:16]
+    return Path(cache_dir).expanduser() / f"{key.get('model_name', 'model')}-{digest}.pt"
+
+
+def load_compiled(path: Path, key: Dict, device: torch.device) -> Union[torch.jit.ScriptModule, None]:
+    """Loads a serialized TorchScript model if it exists and was built for the same key."""
+    if not path.exists():
+        return None
+
+    extra_files = {META_FILE: ""}
+    try:
+        t1 = time.time()
+        model = torch.jit.load(str(path), map_location=device, _extra_files=extra_files)
+        t2 = time.time()
+    except Exception as e:
+        logging.warning(f"can not load compiled model <{path}>: {e}")
+        return None
+
+    meta = json.loads(extra_files[META_FILE] or "{}")
+    if meta.get("key") != key:
+        logging.warning(f"compiled model <{path}> was built for another key: {meta.get('key')}")
+        return None
+
+    logging.info(f"compiled model loaded from <{path}> in {t2 - t1:.2f}s: {key}")
+    model.eval()
+    return model
+
+
+def save_compiled(model: torch.nn.Module, example: torch.Tensor, path: Path, key: Dict) -> torch.jit.ScriptModule:
+    """Traces and freezes the model and saves it to path.
+
+    Returns:
+        Frozen TorchScript model, it is used instead of the eager one.
+    """
+    t1 = time.time()
+    with torch.no_grad():
+        compiled = torch.jit.trace(model.eval(), example, check_trace=False)
+    if hasattr(torch.jit, "freeze"):
+        compiled = torch.jit.freeze(compiled)
+    t2 = time.time()
+
+    try:
+        # atomic for concurrently started workers
+        with atomic_write(path, "wb") as f:
+            torch.jit.save(compiled, f, _extra_files={META_FILE: json.dumps({"key": key})})
+        logging.info(f"compiled model saved to <{path}> in {t2 - t1:.2f}s: {key}")
+    except Exception as e:
+        logging.warning(f"can not save compiled model <{path}>: {e}")
+    return compiled
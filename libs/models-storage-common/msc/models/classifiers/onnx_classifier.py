@@ -0,0 +1,199 @@
+import hashlib
+import inspect
+import json
+import logging
+from pathlib import Path
+import time
+from typing import List, Union
+
+import numpy as np
+import onnxruntime as ort
+
+from msc.models.classifiers.base_classifier import BaseClassifier
+from msc.models.classifiers.preprocessing import fill_letterbox_batch, normalize_
+from msc.utils import atomic_write, file_fingerprint
+from vuka.core import State
+
+ONNX_OPSET = 11
+DEFAULT_ONNX_CACHE_DIR = "~/.cache/msc/onnx"
+
+
+class OnnxClassifier(BaseClassifier):
+    """pretrainedmodels classifier served by onnxruntime.
+
+    The network is exported to ONNX once (onnx_path or onnx_cache_dir), later starts only load the exported file.
+    Only fp32 precision is supported, device selects the execution providers of the session.
+    """
+
+    def __init__(self, **kwargs):
+        super(BaseClassifier, self).__init__()
+
+        self.input_size = kwargs["input_size"]
+        self.threshold = kwargs["threshold"]
+        self.model_name = kwargs["model_name"]
+        self.batch_size = kwargs["batch_size"]
+        self.top_k = int(kwargs.get("top_k") or 1)
+        self.checkpoint_path = kwargs.get("checkpoint_path")
+        self.labels = self.load_labels(self.checkpoint_path, kwargs.get("labels_path"))
+        self.label_names = self.labels.names
+
+        # None - onnxruntime defaults
+        self.num_threads = kwargs.get("num_threads")
+        self.num_interop_threads = kwargs.get("num_interop_threads")
+
+        self.state = State()
+        self.device_id = getattr(self.state, "device_id", None)
+        self.providers = self.select_providers(kwargs.get("device"), self.device_id)
+        self.precision = self.select_precision(kwargs.get("precision"), kwargs.get("fp16_mode", False))
+
+        self.onnx_path = kwargs.get("onnx_path")
+        if self.onnx_path is None:
+            cache_dir = kwargs.get("onnx_cache_dir") or DEFAULT_ONNX_CACHE_DIR
+            name = f"{self.model_name}_{self.input_size}_{len(self.labels)}_opset{ONNX_OPSET}"
+            if self.checkpoint_path is not None:
+                fingerprint = json.dumps(file_fingerprint(self.checkpoint_path), sort_keys=True)
+                name += "_" + hashlib.sha1(fingerprint.encode("utf8")).hexdigest()[:16]
+            self.onnx_path = Path(cache_dir).expanduser() / f"{name}.onnx"
+        self.onnx_path = Path(self.onnx_path)
+
+        if not self.onnx_path.exists():
+            self.export_model()
+
+        self.session = self.load_model()
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+
+        # preallocated io buffers, onnxruntime reads and writes them directly through io binding
+        self._input = np.empty((self.batch_size, 3, self.input_size, self.input_size), dtype=np.float32)
+        self._output = np.empty((self.batch_size, len(self.label_names)), dtype=np.float32)
+        self.io_binding = self.session.io_binding()
+
+        logging.info(
+            f"{self.__class__.__name__} <{self.model_name}>: onnx={self.onnx_path}, "
+            f"providers={self.session.get_providers()}, precision={self.precision}, intra_op_threads={self.num_threads}, "
+            f"inter_op_threads={self.num_interop_threads}"
+        )
+
+    @staticmethod
+    def select_providers(device: Union[str, None], device_id: Union[int, str, None]) -> List[str]:
+        """Selects the onnxruntime execution providers.
+
+        Args:
+            device: "cpu", "cuda" or None. If None cuda is used when --gpu_id is not -1 and onnxruntime has the
+                CUDAExecutionProvider, otherwise cpu.
+            device_id: gpu id from the command line (--gpu_id). -1 (or None) means cpu.
+
+        Returns:
+            providers in the order of preference
+        """
+        available = ort.get_available_providers()
+        if device is None:
+            gpu = device_id is not None and int(device_id) >= 0
+            device = "cuda" if gpu and "CUDAExecutionProvider" in available else "cpu"
+
+        if device == "cpu":
+            return ["CPUExecutionProvider"]
+        if device != "cuda":
+            raise Exception(f"device {device} is not supported by OnnxClassifier, use 'cpu', 'cuda' or None")
+        if "CUDAExecutionProvider" not in available:
+            raise Exception(
+                f"CUDAExecutionProvider NOT FOUND. INSTALL onnxruntime-gpu OR SET device='cpu' TO RUN ON CPU! "
+                f"available providers: {available}"
+            )
+        # CUDA_VISIBLE_DEVICES is set to the selected gpu, so it is always visible as device 0
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+
+    @staticmethod
+    def select_precision(precision: Union[str, None], fp16_mode: bool) -> str:
+        """Checks the precision, the exported model is always fp32.
+
+        Args:
+            precision: "fp32" or None. Other precisions of TorchClassifier are not supported.
+            fp16_mode: legacy flag of TorchClassifier, ignored with a warning.
+
+        Returns:
+            "fp32"
+        """
+        if precision not in (None, "fp32"):
+            raise Exception(
+                f"precision {precision} is not supported by OnnxClassifier, use 'fp32' or type='TorchClassifier'"
+            )
+        if precision is None and fp16_mode:
+            logging.warning("OnnxClassifier: fp16_mode is not supported and ignored, the model runs in fp32")
+        return "fp32"
+
+    def export_model(self) -> None:
+        # torch is needed only for the export
+        import torch
+
+        from msc.models.classifiers.torch_classifier import TorchClassifier
+
+        export_kwargs = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            # TorchScript based exporter, it does not need onnxscript
+            export_kwargs["dynamo"] = False
+
+        t1 = time.time()
+        model = TorchClassifier.get_model(
+            model_name=self.model_name, num_classes=len(self.labels), checkpoint_path=self.checkpoint_path
+        ).eval()
+        example = torch.zeros((1, 3, self.input_size, self.input_size))
+
+        with torch.no_grad(), atomic_write(self.onnx_path, "wb") as f:
+            torch.onnx.export(
+                model,
+                example,
+                f,
+                input_names=["input"],
+                output_names=["logits"],
+                dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=ONNX_OPSET,
+                **export_kwargs,
+            )
+        t2 = time.time()
+        logging.info(f"{self.model_name} exported to <{self.onnx_path}> in {t2 - t1:.2f}s")
+
+    def load_model(self) -> ort.InferenceSession:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads is not None:
+            options.intra_op_num_threads = int(self.num_threads)
+        if self.num_interop_threads is not None:
+            options.inter_op_num_threads = int(self.num_interop_threads)
+        return ort.InferenceSession(str(self.onnx_path), sess_options=options, providers=self.providers)
+
+    def memory_bytes(self) -> int:
+        # веса живут в сессии onnxruntime, их размер близок к размеру onnx файла
+        return self.onnx_path.stat().st_size
+
+    def predict_top_k_on_batch(self, batch: List[np.ndarray], threshold=None, top_k=None):
+        threshold = self.threshold if threshold is None else threshold
+        top_k = self.top_k if top_k is None else int(top_k)
+        n = len(batch)
+        if n > self._input.shape[0]:
+            self._input = np.empty((n,) + self._input.shape[1:], dtype=np.float32)
+            self._output = np.empty((n,) + self._output.shape[1:], dtype=np.float32)
+
+        inputs = self._input[:n]
+        fill_letterbox_batch(batch, inputs)
+        normalize_(inputs)
+
+        logits = self._output[:n]
+        self.io_binding.bind_cpu_input(self.input_name, inputs)
+        self.io_binding.bind_output(
+            self.output_name, "cpu", 0, np.float32, list(logits.shape), logits.ctypes.data,
+        )
+        self.session.run_with_iobinding(self.io_binding)
+
+        # softmax
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        k = min(top_k, probabilities.shape[1])
+        top_indices = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(probabilities, top_indices, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return top_scores, top_indices, top_scores >= threshold
@@ -0,0 +1,86 @@
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+# ImageNet normalization, the same as albumentations.Normalize defaults
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+MAX_PIXEL_VALUE = 255.0
+
+
+def letterbox_params(height: int, width: int, size: int) -> Tuple[int, int, int, int]:
+    """Computes the geometry of an image fitted into a size x size square (keeping aspect ratio).
+
+    Args:
+        height: Source image height.
+        width: Source image width.
+        size: Side of the output square.
+
+    Returns:
+        (resized height, resized width, top offset, left offset)
+    """
+    scale = size / max(height, width)
+    new_h = min(size, max(1, int(round(height * scale))))
+    new_w = min(size, max(1, int(round(width * scale))))
+    top = (size - new_h) // 2
+    left = (size - new_w) // 2
+    return new_h, new_w, top, left
+
+
+def letterbox_resize(image: np.ndarray, size: int) -> np.ndarray:
+    """Resizes image by the longest side to the letterbox geometry of a size x size square, without padding.
+
+    An image which already has this geometry is returned as is, so letterbox_into of a resized image only copies it.
+
+    Args:
+        image: HxW or HxWxC image.
+        size: Side of the square.
+    """
+    h, w = image.shape[:2]
+    new_h, new_w, _, _ = letterbox_params(h, w, size)
+    if (new_h, new_w) != (h, w):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return image
+
+
+def letterbox_into(image: np.ndarray, out: np.ndarray) -> None:
+    """Resizes image by the longest side and writes it into the center of out.
+
+    The padding area of out is not touched, so it must be filled by the caller.
+
+    Args:
+        image: HxWx3 image.
+        out: SxSx3 array (may be a non-contiguous view, e.g. a CHW buffer transposed to HWC).
+    """
+    size = out.shape[0]
+    image = letterbox_resize(image, size)
+    new_h, new_w, top, left = letterbox_params(image.shape[0], image.shape[1], size)
+    out[top : top + new_h, left : left + new_w] = image
+
+
+def pad_value() -> np.ndarray:
+    """Padding value in pixel space. It becomes zero after normalization."""
+    return np.array(IMAGENET_MEAN, dtype=np.float32) * MAX_PIXEL_VALUE
+
+
+def fill_letterbox_batch(images, batch: np.ndarray) -> None:
+    """Writes images into a preallocated float (N, 3, S, S) batch.
+
+    Args:
+        images: List of HxWx3 images, len(images) <= N.
+        batch: float32 array of shape (N, 3, S, S).
+    """
+    hwc = batch[: len(images)].transpose(0, 2, 3, 1)
+    hwc[...] = pad_value()
+    for i, image in enumerate(images):
+        letterbox_into(image, hwc[i])
+
+
+def normalize_(batch: np.ndarray) -> np.ndarray:
+    """In-place ImageNet normalization of a float (N, 3, S, S) batch."""
+    mean = (np.array(IMAGENET_MEAN, dtype=np.float32) * MAX_PIXEL_VALUE).reshape(1, 3, 1, 1)
+    std = (np.array(IMAGENET_STD, dtype=np.float32) * MAX_PIXEL_VALUE).reshape(1, 3, 1, 1)
+    np.subtract(batch, mean, out=batch)
+    np.divide(batch, std, out=batch)
+    return batch
@@ -0,0 +1,77 @@
+import logging
+from pathlib import Path
+import time
+from typing import Callable, Iterator, List
+
+import cv2
+import numpy as np
+import torch
+from torch import nn
+
+# новые версии torch держат квантизацию в torch.ao
+quantization = torch.ao.quantization if hasattr(torch, "ao") else torch.quantization
+
+CALIBRATION_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif")
+
+
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+    """Dynamic INT8 quantization of the Linear layers (weights are int8, activations are quantized on the fly)."""
+    return quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def calibration_images(calibration_dir: str, max_images: int) -> List[np.ndarray]:
+    paths = sorted(p for p in Path(calibration_dir).expanduser().rglob("*") if p.suffix.lower() in CALIBRATION_EXTS)
+    images = []
+    for path in paths:
+        image = cv2.imread(str(path))
+        if image is None:
+            logging.warning(f"calibration image <{path}> can not be read")
+            continue
+        images.append(image)
+        if len(images) >= max_images:
+            break
+
+    if len(images) == 0:
+        raise Exception(f"calibration images not found in <{calibration_dir}>")
+    return images
+
+
+def quantize_static(
+    model: nn.Module, example: torch.Tensor, calibration_batches: Iterator[torch.Tensor], backend: str = "fbgemm",
+) -> nn.Module:
+    """Static post-training INT8 quantization (FX graph mode).
+
+    Args:
+        model: fp32 model in eval mode on cpu.
+        example: example input for the graph tracing.
+        calibration_batches: preprocessed batches for the observers calibration.
+        backend: quantized engine, fbgemm for x86.
+
+    Returns:
+        Quantized model.
+    """
+    try:
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+    except ImportError:
+        raise Exception(f"static INT8 quantization needs torch>=1.13, torch version: {torch.__version__}")
+
+    torch.backends.quantized.engine = backend
+
+    t1 = time.time()
+    prepared = prepare_fx(model.eval(), get_default_qconfig_mapping(backend), (example,))
+    count = 0
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+            count += batch.shape[0]
+    quantized = convert_fx(prepared)
+    t2 = time.time()
+
+    logging.info(f"static INT8 quantization: {count} calibration images, {t2 - t1:.2f}s")
+    return quantized
+
+
+def batches(images: List[np.ndarray], batch_size: int, preprocess: Callable) -> Iterator[torch.Tensor]:
+    for i in range(0, len(images), batch_size):
+        yield preprocess(images[i : i + batch_size])
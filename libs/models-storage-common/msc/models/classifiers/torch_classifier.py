@@ -1,22 +1,23 @@
+from contextlib import contextmanager
+import logging
 from typing import List, Union
 
-
-import albumentations as albu
-from albumentations.pytorch import ToTensor
 import numpy as np
 import pretrainedmodels
 import torch
 from torch import nn
 from torch.nn.functional import softmax
-from torchvision import transforms
 
 from msc.models.classifiers.base_classifier import BaseClassifier
+from msc.models.classifiers.checkpoint import assign_state_dict, load_state_dict
+from msc.models.classifiers.compiled_cache import compiled_cache_key, compiled_cache_path, load_compiled, save_compiled
+from msc.models.classifiers.preprocessing import fill_letterbox_batch, IMAGENET_MEAN, IMAGENET_STD, MAX_PIXEL_VALUE
+from msc.models.classifiers.quantization import batches, calibration_images, quantize_dynamic, quantize_static
+from msc.utils import file_fingerprint
 from vuka.core import State
-from msc.data import imagenet_labels
 
 
-BORDER_CONSTANT = 0
-BORDER_REFLECT = 2
+PRECISIONS = ("fp32", "fp16", "bf16", "int8_dynamic", "int8_static")
 
 
 class TorchClassifier(BaseClassifier):
@@ -24,81 +25,234 @@ class TorchClassifier(BaseClassifier):
         super(BaseClassifier, self).__init__()
 
         self.input_size = kwargs["input_size"]
-        self.fp16_mode = kwargs["fp16_mode"]
+        self.fp16_mode = kwargs.get("fp16_mode", False)
         self.threshold = kwargs["threshold"]
         self.model_name = kwargs["model_name"]
         self.batch_size = kwargs["batch_size"]
-        self.labels = imagenet_labels
+        self.top_k = int(kwargs.get("top_k") or 1)
+
+        # local weights. None - pretrainedmodels imagenet weights
+        self.checkpoint_path = kwargs.get("checkpoint_path")
+        self.labels = self.load_labels(self.checkpoint_path, kwargs.get("labels_path"))
+        self.label_names = self.labels.names
+
+        # cpu execution params. None - use torch defaults
+        self.num_threads = kwargs.get("num_threads")
+        self.num_interop_threads = kwargs.get("num_interop_threads")
+        self.channels_last = kwargs.get("channels_last")
+
+        # directory of traced and frozen models. None - the cache is disabled
+        self.compiled_cache_dir = kwargs.get("compiled_cache_dir")
+
+        # static INT8 quantization calibration images
+        self.calibration_dir = kwargs.get("calibration_dir")
+        self.calibration_size = int(kwargs.get("calibration_size") or 100)
 
         self.state = State()
-        self.device_id = self.state.device_id
+        self.device_id = getattr(self.state, "device_id", None)
+        self.device = self.select_device(kwargs.get("device"), self.device_id)
+        self.precision = self.select_precision(kwargs.get("precision"), self.fp16_mode, self.device)
+
+        if self.device.type == "cpu":
+            self.set_cpu_threads(self.num_threads, self.num_interop_threads)
+            if self.channels_last is None:
+                # channels last conversion copies conv weights, memory-mapped checkpoint pages would not be shared
+                self.channels_last = self.checkpoint_path is None
+        self.channels_last = bool(self.channels_last)
 
-        if int(self.device_id) == -1:
-            raise Exception(f"GPU NOT FOUND. PLEASE SET GPU_ID FOR USE THIS MODULE! device_id: {self.device_id}")
-        elif int(self.device_id) >= 0:
-            self.device = torch.device("cuda:0")
+        # preallocated host batch (N, 3, S, S), images are letterboxed straight into it
+        self._batch = torch.empty(
+            (self.batch_size, 3, self.input_size, self.input_size),
+            dtype=torch.float32,
+            pin_memory=self.device.type == "cuda",
+        )
+        self._mean = torch.tensor(IMAGENET_MEAN, device=self.device).view(1, 3, 1, 1) * MAX_PIXEL_VALUE
+        self._std = torch.tensor(IMAGENET_STD, device=self.device).view(1, 3, 1, 1) * MAX_PIXEL_VALUE
 
         self.model = self.load_model()
-        self.valid_transforms = self.compose([self.pre_transforms(), self.post_transforms()])
-        self.to_tensor = transforms.ToTensor()
+
+        logging.info(
+            f"{self.__class__.__name__} <{self.model_name}>: device={self.device}, precision={self.precision}, "
+            f"intra_op_threads={torch.get_num_threads()}, inter_op_threads={torch.get_num_interop_threads()}, "
+            f"channels_last={self.channels_last}, inference_mode={hasattr(torch, 'inference_mode')}"
+        )
+
+    @staticmethod
+    def select_device(device: Union[str, None], device_id: Union[int, str, None]) -> torch.device:
+        """Selects the execution device.
+
+        Args:
+            device: "cpu", "cuda" or None. If None the device is selected by device_id.
+            device_id: gpu id from the command line (--gpu_id). -1 (or None) means cpu.
+
+        Returns:
+            torch.device
+        """
+        if device is None:
+            device = "cpu" if device_id is None or int(device_id) < 0 else "cuda"
+
+        if device == "cpu":
+            return torch.device("cpu")
+
+        if not torch.cuda.is_available():
+            raise Exception(f"GPU NOT FOUND. SET device='cpu' OR --gpu_id -1 TO RUN ON CPU! device_id: {device_id}")
+        # CUDA_VISIBLE_DEVICES is set to the selected gpu, so it is always visible as cuda:0
+        return torch.device("cuda:0")
+
+    @staticmethod
+    def select_precision(precision: Union[str, None], fp16_mode: bool, device: torch.device) -> str:
+        """Validates the precision. If precision is None, the legacy fp16_mode flag is used (fp16 on gpu only)."""
+        if precision is None:
+            precision = "fp16" if fp16_mode and device.type == "cuda" else "fp32"
+
+        if precision not in PRECISIONS:
+            raise Exception(f"unknown precision {precision}, supported: {PRECISIONS}")
+        if precision == "fp16" and device.type != "cuda":
+            raise Exception("fp16 precision is supported on gpu only, use bf16 or int8_* on cpu")
+        if precision.startswith("int8") and device.type != "cpu":
+            raise Exception(f"{precision} precision is supported on cpu only")
+        return precision
 
     @staticmethod
-    def compose(transforms_to_compose):
-        # combine all augmentations into one single pipeline
-        result = albu.Compose([item for sublist in transforms_to_compose for item in sublist])
-        return result
+    def set_cpu_threads(num_threads: Union[int, None], num_interop_threads: Union[int, None]) -> None:
+        if num_threads is not None:
+            torch.set_num_threads(int(num_threads))
+        if num_interop_threads is not None:
+            try:
+                torch.set_num_interop_threads(int(num_interop_threads))
+            except RuntimeError as e:
+                # inter-op pool can be configured only once per process, before any parallel work
+                logging.warning(f"can not set inter-op threads to {num_interop_threads}: {e}")
 
     @staticmethod
-    def get_model(model_name: str, num_classes: int):
+    def inference_context():
+        if hasattr(torch, "inference_mode"):
+            return torch.inference_mode()
+        return torch.no_grad()
+
+    @contextmanager
+    def autocast(self):
+        if self.precision in ("fp16", "bf16"):
+            dtype = torch.float16 if self.precision == "fp16" else torch.bfloat16
+            with torch.autocast(device_type=self.device.type, dtype=dtype):
+                yield
+        else:
+            yield
+
+    @staticmethod
+    def get_model(model_name: str, num_classes: int, checkpoint_path: Union[str, None] = None):
         model_fn = pretrainedmodels.__dict__[model_name]
 
-        model = model_fn(num_classes=1000, pretrained="imagenet")
+        # with a local checkpoint nothing is downloaded
+        model = model_fn(num_classes=1000, pretrained="imagenet" if checkpoint_path is None else None)
 
         model.fc = nn.Sequential()
-        dim_feats = model.last_linear.in_features
-        model.last_linear = nn.Linear(dim_feats, num_classes)
+        if checkpoint_path is not None or num_classes != 1000:
+            dim_feats = model.last_linear.in_features
+            model.last_linear = nn.Linear(dim_feats, num_classes)
+
+        if checkpoint_path is not None:
+            model = assign_state_dict(model, load_state_dict(checkpoint_path))
         return model
 
-    def pre_transforms(self):
-        # Convert the image to a square of size image_size x image_size
-        # (keeping aspect ratio)
-        result = [
-            albu.LongestMaxSize(max_size=self.input_size),
-        ]
-        return result
+    def compiled_key(self):
+        return compiled_cache_key(
+            model_name=self.model_name,
+            input_size=self.input_size,
+            num_classes=len(self.labels),
+            checkpoint=file_fingerprint(self.checkpoint_path) if self.checkpoint_path is not None else None,
+            precision=self.precision,
+            device=self.device.type,
+            channels_last=self.channels_last,
+            calibration=[self.calibration_dir, self.calibration_size] if self.precision == "int8_static" else None,
+        )
 
-    @staticmethod
-    def post_transforms():
-        # we use ImageNet image normalization
-        # and convert it to torch.Tensor
-        result = [albu.Normalize(), ToTensor()]
-        return result
+    def example_input(self) -> torch.Tensor:
+        example = torch.zeros((self.batch_size, 3, self.input_size, self.input_size), device=self.device)
+        if self.channels_last:
+            example = example.contiguous(memory_format=torch.channels_last)
+        return example
 
     def load_model(self):
-        model = self.get_model(model_name=self.model_name, num_classes=len(self.labels))
+        if self.compiled_cache_dir is not None:
+            key = self.compiled_key()
+            path = compiled_cache_path(self.compiled_cache_dir, key)
+            model = load_compiled(path, key, self.device)
+            if model is not None:
+                return model
+
+        model = self.get_model(
+            model_name=self.model_name, num_classes=len(self.labels), checkpoint_path=self.checkpoint_path
+        )
         model.to(self.device)
+        if self.channels_last:
+            model.to(memory_format=torch.channels_last)
         model.eval()
+        model = self.quantize(model)
+
+        if self.compiled_cache_dir is not None:
+            with self.autocast():
+                model = save_compiled(model, self.example_input(), path, key)
+        return model
+
+    def quantize(self, model: nn.Module) -> nn.Module:
+        if self.precision == "int8_dynamic":
+            return quantize_dynamic(model)
+
+        if self.precision == "int8_static":
+            if self.calibration_dir is None:
+                raise Exception("int8_static precision needs calibration_dir with calibration images")
+            images = calibration_images(self.calibration_dir, self.calibration_size)
+            return quantize_static(model, self.example_input(), batches(images, self.batch_size, self.preprocess))
+
         return model
 
-    def predict_on_batch(self, batch):
-        pass
+    def preprocess(self, images: List[np.ndarray]) -> torch.Tensor:
+        """Letterboxes images into the preallocated batch and normalizes it on the device.
 
-    def predict(self, input: Union[List[np.ndarray], np.ndarray]):
-        if not isinstance(input, list):
-            input = [input]
+        Args:
+            images: List of HxWx3 images, len(images) <= batch_size.
 
-        tensor = torch.stack([self.valid_transforms(image=image)["image"] for image in input]).to(self.device)
+        Returns:
+            Normalized (N, 3, S, S) tensor on self.device.
+        """
+        n = len(images)
+        if n > self._batch.shape[0]:
+            self._batch = torch.empty((n, 3, self.input_size, self.input_size), dtype=torch.float32)
 
-        with torch.no_grad():
-            logits = self.model(tensor)
+        fill_letterbox_batch(images, self._batch.numpy())
 
-        probabilities = softmax(logits, dim=1)
-        predictions = probabilities.argmax(dim=1)
+        tensor = self._batch[:n].to(self.device, non_blocking=True)
+        tensor = tensor.sub_(self._mean).div_(self._std)
+        if self.channels_last:
+            tensor = tensor.contiguous(memory_format=torch.channels_last)
+        return tensor
+
+    def memory_bytes(self) -> Union[int, None]:
+        # state_dict включает буферы и упакованные веса квантованных слоев. У замороженных TorchScript моделей
+        # (compiled_cache_dir) веса встроены в граф константами и не видны - размер неизвестен
+        tensors = []
+        for value in self.model.state_dict().values():
+            tensors.extend(value if isinstance(value, tuple) else [value])
+        total = sum(t.numel() * t.element_size() for t in tensors if torch.is_tensor(t))
+        return total if total > 0 else None
+
+    def predict_top_k_on_batch(self, batch: List[np.ndarray], threshold=None, top_k=None):
+        threshold = self.threshold if threshold is None else threshold
+        top_k = self.top_k if top_k is None else int(top_k)
+        tensor = self.preprocess(batch)
+
+        with self.inference_context(), self.autocast():
+            logits = self.model(tensor)
 
-        scores, labels = [], []
+        probabilities = softmax(logits.float(), dim=1)
+        top_scores, top_indices = probabilities.topk(min(top_k, probabilities.shape[1]), dim=1)
+        keep = top_scores >= threshold
 
-        for prob, pred in zip(probabilities, predictions):
-            scores.append(max(prob.cpu().numpy()))
-            labels.append(self.labels[int(pred.cpu().numpy())])
+        # single device -> host transfer: (3, N, k) = scores, indices, keep mask
+        packed = torch.stack((top_scores, top_indices.to(top_scores.dtype), keep.to(top_scores.dtype))).cpu().numpy()
+        top_scores = packed[0]
+        top_indices = packed[1].astype(np.int64)
+        keep = packed[2].astype(bool)
 
-        return scores, labels
+        return top_scores, top_indices, keep
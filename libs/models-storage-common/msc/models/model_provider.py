@@ -3,6 +3,7 @@ import copy
 import six
 
 from msc import models as parent
+from msc.models.model_registry import ModelRegistry
 
 
 def is_str(x):
@@ -13,12 +14,21 @@ def is_str(x):
 class ModelProvider:
     @staticmethod
     def get_model(model_cfg):
+        """Creates the model described by model_cfg.
+
+        If shared_model is not False (default), the model is taken from the process-wide registry: blocks with the same
+        model params share one loaded network. Otherwise the block gets its own network. In both cases a ModelHandle is
+        returned: predict is serialized by the model lock and the handle must be released by the block.
+        """
         model_info = copy.deepcopy(model_cfg)
 
         model_type = model_info.pop("type")
+        shared = model_info.pop("shared_model", True)
         try:
             if is_str(model_type):
                 model_type = getattr(parent, model_type)
-            return model_type(**model_info)
+            if not shared:
+                return ModelRegistry.private(model_type, model_info, lambda: model_type(**model_info))
+            return ModelRegistry.singleton().acquire(model_type, model_info, lambda: model_type(**model_info))
         except Exception:
             raise
@@ -0,0 +1,131 @@
+import json
+import logging
+import threading
+from typing import Callable, Dict, List
+
+# параметры постобработки и блока: не влияют на загруженную сеть, у каждого блока свои
+NOT_SHARED_KEYS = (
+    "turn_on",
+    "module",
+    "data",
+    "threshold",
+    "top_k",
+    "shared_model",
+    "result_cache_path",
+    "result_cache_size_mb",
+)
+
+
+class ModelEntry:
+    def __init__(self, key: str, model) -> None:
+        self.key = key
+        self.model = model
+        self.refs = 0
+        # модель не обязана быть потокобезопасной, инференс сериализуется
+        self.lock = threading.Lock()
+
+    @property
+    def memory_bytes(self):
+        memory_bytes = getattr(self.model, "memory_bytes", None)
+        return memory_bytes() if callable(memory_bytes) else None
+
+
+class ModelHandle:
+    """Block's reference to a model. Keeps block's own post-processing params.
+
+    Inference through the handle is serialized by the model lock, for shared and not shared models alike.
+    registry is None for a model which is not shared.
+    """
+
+    def __init__(self, registry, entry: ModelEntry, threshold=None, top_k=None) -> None:
+        self._registry = registry
+        self._entry = entry
+        self.threshold = threshold
+        self.top_k = top_k
+        self.released = False
+
+    def predict(self, input, **kwargs):
+        """Thread-safe inference entry point."""
+        kwargs.setdefault("threshold", self.threshold)
+        kwargs.setdefault("top_k", self.top_k)
+        with self._entry.lock:
+            return self._entry.model.predict(input, **kwargs)
+
+    def predict_top_k(self, input, **kwargs):
+        kwargs.setdefault("threshold", self.threshold)
+        kwargs.setdefault("top_k", self.top_k)
+        with self._entry.lock:
+            return self._entry.model.predict_top_k(input, **kwargs)
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            if self._registry is not None:
+                self._registry.release(self._entry)
+
+    def __getattr__(self, name):
+        return getattr(self._entry.model, name)
+
+
+class ModelRegistry:
+    """Process-wide reference-counted registry of loaded models."""
+
+    _instance = None
+
+    @classmethod
+    def singleton(cls):
+        if cls._instance is None:
+            cls._instance = ModelRegistry()
+        return cls._instance
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, ModelEntry] = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_type, model_info: Dict) -> str:
+        params = {k: v for k, v in model_info.items() if k not in NOT_SHARED_KEYS}
+        params["type"] = str(getattr(model_type, "__name__", model_type))
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def acquire(self, model_type, model_info: Dict, create: Callable) -> ModelHandle:
+        key = self.make_key(model_type, model_info)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = ModelEntry(key, create())
+                self._entries[key] = entry
+            entry.refs += 1
+
+        logging.info(f"model registry: {key} refs={entry.refs}, memory={self.format_bytes(entry.memory_bytes)}")
+        return ModelHandle(self, entry, threshold=model_info.get("threshold"), top_k=model_info.get("top_k"))
+
+    @staticmethod
+    def private(model_type, model_info: Dict, create: Callable) -> ModelHandle:
+        """Handle of a model which is not shared: own network, the same locking as for shared models."""
+        entry = ModelEntry(ModelRegistry.make_key(model_type, model_info), create())
+        entry.refs = 1
+        return ModelHandle(None, entry, threshold=model_info.get("threshold"), top_k=model_info.get("top_k"))
+
+    def release(self, entry: ModelEntry) -> None:
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs <= 0 and self._entries.get(entry.key) is entry:
+                del self._entries[entry.key]
+                logging.info(f"model registry: {entry.key} unloaded")
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {"key": entry.key, "refs": entry.refs, "memory_bytes": entry.memory_bytes}
+                for entry in self._entries.values()
+            ]
+
+    def total_memory_bytes(self) -> int:
+        return sum(entry["memory_bytes"] or 0 for entry in self.stats())
+
+    @staticmethod
+    def format_bytes(value) -> str:
+        if value is None:
+            return "unknown"
+        return f"{value / 2 ** 20:.1f}MB"
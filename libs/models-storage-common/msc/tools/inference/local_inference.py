@@ -3,11 +3,9 @@
 import argparse
 import logging
 import os
+import sys
 
-import cv2
-
-from msc.tools import Runner
-from msc.utils.ioutils import DataProvider
+from msc.utils.startup import StartupReport
 
 
 def parse_args(input_args=None):
@@ -19,15 +17,81 @@ def parse_args(input_args=None):
         "--show", action="store_true", required=False, help="Показать инференс в cv2.imshow",
     )
 
-    parser.add_argument("--gpu_id", required=False, default=0, help="GPU ID")
+    parser.add_argument(
+        "--startup_report", "--startup-report", action="store_true", required=False, help="Отчет о времени запуска",
+    )
+
+    parser.add_argument("--gpu_id", required=False, default=0, help="GPU ID. -1 - инференс на CPU")
+
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        required=False,
+        help="Число процессов для папки с видео или маски видео, каждое видео целиком обрабатывается одним процессом",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        required=False,
+        help="Конвейер: декодирование, препроцессинг и инференс в отдельных потоках. Инференс всегда в одном потоке",
+    )
+    parser.add_argument("--pipeline_queue_size", type=int, default=4, required=False, help="Размер очередей конвейера")
+    parser.add_argument(
+        "--pipeline_preprocess_workers",
+        type=int,
+        default=1,
+        required=False,
+        help="Число потоков препроцессинга блоков (BaseBlock.preprocess)",
+    )
+    parser.add_argument(
+        "--pipeline_backpressure",
+        default="block",
+        choices=["block", "drop_oldest"],
+        required=False,
+        help="Поведение при заполненной очереди: ждать или выбрасывать самый старый кадр (для живых потоков)",
+    )
 
     parser.add_argument("--input_batch_size", type=int, required=False)
     parser.add_argument("--input_width", type=int, required=False)
     parser.add_argument("--input_height", type=int, required=False)
     parser.add_argument("--input_size_scale", type=float, required=False)
-    parser.add_argument("--input_fps", type=float, required=False)
-    parser.add_argument("--input_skip_frames", required=False)
+    parser.add_argument(
+        "--input_fps", type=float, required=False, help="Целевая частота кадров видео, лишние кадры пропускаются",
+    )
+    parser.add_argument(
+        "--input_skip_frames", type=int, required=False, help="Обрабатывать каждый N-й кадр видео (приоритетнее fps)",
+    )
     parser.add_argument("--input_total_frames", type=int, required=False)
+    parser.add_argument(
+        "--input_prefetch",
+        type=int,
+        default=0,
+        required=False,
+        help="Число кадров видео, декодируемых заранее в отдельном потоке. 0 - без предвыборки",
+    )
+    parser.add_argument(
+        "--input_decode_workers",
+        type=int,
+        default=0,
+        required=False,
+        help="Число потоков декодирования изображений. 0 - декодирование в основном потоке",
+    )
+    parser.add_argument(
+        "--input_decode_prefetch", type=int, default=2, required=False, help="Число батчей изображений в обработке",
+    )
+    parser.add_argument(
+        "--input_reduced_decode",
+        action="store_true",
+        required=False,
+        help="Декодировать большие JPEG сразу в уменьшенном размере (не меньше input_size моделей). "
+        "Меняет разрешение всех выходов: container.image, width/height, визуализации, --show",
+    )
+    parser.add_argument(
+        "--input_video_index_dir",
+        required=False,
+        help="Кэш индексов ключевых кадров видео для произвольного доступа. По умолчанию ~/.cache/msc/video_index",
+    )
 
     parser.add_argument("--input", required=False, help="Анализировать контент по пути input")
     parser.add_argument("--input_usb_cam", required=False)
@@ -37,6 +101,24 @@ def parse_args(input_args=None):
     parser.add_argument("--input_image_path", required=False)
     parser.add_argument("--input_images_dir", required=False)
     parser.add_argument("--input_videos_dir", required=False)
+    parser.add_argument(
+        "--input_manifest",
+        required=False,
+        help="Манифест папки с изображениями (путь, размер, mtime): обрабатываются только новые и измененные файлы",
+    )
+    parser.add_argument(
+        "--input_manifest_trust",
+        action="store_true",
+        required=False,
+        help="Не перечитывать каталоги, mtime которых не изменился с прошлого запуска",
+    )
+    parser.add_argument(
+        "--input_unsorted_paths",
+        dest="input_sort_paths",
+        action="store_false",
+        required=False,
+        help="Обходить каталоги в порядке os.scandir без сортировки (быстрее на больших каталогах)",
+    )
     parser.add_argument("--input_video_path", required=False)
     parser.add_argument("--input_coco_json_path", required=False)
     parser.add_argument("--input_json_path", required=False)
@@ -62,34 +144,131 @@ def parse_args(input_args=None):
 
 
 class LocalInference:
+    def __init__(self, startup_report: StartupReport = None) -> None:
+        self.startup_report = startup_report
+
+    def mark(self, phase: str) -> None:
+        if self.startup_report is not None:
+            self.startup_report.mark(phase)
+
+    def finish_startup_report(self) -> None:
+        """Prints the startup report and uninstalls its import hook, does nothing if it is already finished."""
+        if self.startup_report is not None:
+            self.startup_report.finish()
+            self.startup_report = None
+
     def __call__(self, args) -> None:
         os.environ["CUDA_VISIBLE_DEVICES"] = str(args.gpu_id)
 
+        # тяжелые зависимости импортируются после разбора аргументов
+        import cv2
+
+        from msc.tools import Runner
+        from msc.utils.ioutils import DataProvider
+
+        self.mark("imports")
+
+        if args.num_workers > 1:
+            data_provider = DataProvider(args)
+            if data_provider.is_videos_set():
+                from msc.tools.inference.sharded import run_sharded
+
+                run_sharded(args, data_provider.get_videos_paths())
+                return
+            logging.warning("--num_workers is applicable only to a videos dir or a videos mask, ignored")
+
         runner = Runner(config=args.config, device_id=args.gpu_id)
+        self.mark("runner")
+        if args.input_reduced_decode:
+            args.input_decode_size = runner.decode_size()
+        args.input_lazy_draw_buffers = not runner.mutates_image()
         data_provider = DataProvider(args)
 
         providers = data_provider.get_data()
+        self.mark("data_provider")
+
+        try:
+            for provider_i, provider in enumerate(providers):
+                results = self.run_provider(args, runner, provider)
+                try:
+                    for frame_i, containers in enumerate(results):
+                        if self.startup_report is not None:
+                            self.mark("first_batch")
+                            self.finish_startup_report()
+
+                        if args.show:
+                            for container in containers:
+                                cv2.imshow("inference", container.image)
+                                key = cv2.waitKey(1)
+                                if key == 27:
+                                    raise Exception("ESC")
+                except KeyboardInterrupt:
+                    logging.error("Keyboard Interrupt")
+                finally:
+                    results.close()
+        finally:
+            runner.close()
+            self.log_draw_buffers()
+
+    @staticmethod
+    def log_draw_buffers() -> None:
+        from vuka.core import Container
+
+        stats = Container.draw_buffer_stats()
+        if stats["deferred"] > 0:
+            logging.info(
+                f"draw buffers: {stats['materialized']} of {stats['deferred']} copies made, "
+                f"{stats['saved_bytes'] / 2 ** 20:.1f}MB not copied"
+            )
+
+    @staticmethod
+    def run_provider(args, runner, provider):
+        """Yields processed containers of the provider. Show and sinks stay in the calling thread.
+
+        The provider is committed (provider.commit) only after the caller consumed every batch without errors, an
+        exception or an early close of the generator leaves it uncommitted.
+        """
+        if not args.pipelined:
+            for containers in provider():
+                yield runner(containers)
+            provider.commit()
+            return
+
+        from msc.tools.inference.pipeline import PipelinedExecutor
 
-        for provider_i, provider in enumerate(providers):
-            try:
-                for frame_i, containers in enumerate(provider()):
-                    containers = runner(containers)
+        # блоки не потокобезопасны (буферы моделей, состояние SceneGate) и ожидают кадры по порядку,
+        # поэтому параллельно выполняются только декодирование и препроцессинг
+        executor = PipelinedExecutor(
+            stages=[
+                ("preprocess", runner.preprocess, args.pipeline_preprocess_workers),
+                ("infer", runner, 1),
+            ],
+            queue_size=args.pipeline_queue_size,
+            backpressure=args.pipeline_backpressure,
+        )
+        yield from executor.run(provider())
 
-                    if args.show is not None:
-                        for container in containers:
-                            cv2.imshow("inference", container.image)
-                            key = cv2.waitKey(1)
-                            if key == 27:
-                                raise Exception("ESC")
-            except KeyboardInterrupt:
-                logging.error("Keyboard Interrupt")
+        dropped = sum(stats["dropped"] for stats in executor.stats_dict())
+        if dropped > 0:
+            logging.warning(f"{dropped} batches were dropped by the backpressure policy, the provider is not committed")
+            return
+        provider.commit()
 
 
 def main(input_args=None):
-    args = parse_args(input_args)
+    argv = sys.argv[1:] if input_args is None else input_args
+    startup_report = None
+    if "--startup_report" in argv or "--startup-report" in argv:
+        startup_report = StartupReport().install()
 
-    local_inference = LocalInference()
-    local_inference(args)
+    local_inference = LocalInference(startup_report=startup_report)
+    try:
+        args = parse_args(input_args)
+        local_inference.mark("parse_args")
+        local_inference(args)
+    finally:
+        # пустой вход, шардирование или ошибка до первого батча: отчет все равно печатается, хук импорта снимается
+        local_inference.finish_startup_report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest")
+
+# признак конца потока данных
+_END = object()
+_POLL_SECONDS = 0.1
+
+
+class StageStats:
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.dropped = 0
+        # глубина входной очереди стадии
+        self.depth_sum = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+        self.lock = threading.Lock()
+
+    def add_depth(self, depth: int) -> None:
+        with self.lock:
+            self.depth_sum += depth
+            self.depth_samples += 1
+            self.depth_max = max(self.depth_max, depth)
+
+    def add_item(self, seconds: float) -> None:
+        with self.lock:
+            self.items += 1
+            self.busy_seconds += seconds
+
+    def to_dict(self, wall_seconds: float) -> Dict:
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "dropped": self.dropped,
+            "utilization": self.busy_seconds / max(wall_seconds * self.workers, 1e-9),
+            "queue_depth_avg": self.depth_sum / max(self.depth_samples, 1),
+            "queue_depth_max": self.depth_max,
+        }
+
+
+class PipelinedExecutor:
+    """Runs stages in separate threads connected by bounded queues.
+
+    The source is iterated by a single thread, every stage has its own workers, results are returned to the caller
+    in the source order. A single-worker stage also gets its items in the source order, even after a stage with
+    several workers, so it can keep state which depends on the order of items.
+
+    Args:
+        stages: [(name, function, workers)], function takes and returns one item.
+        queue_size: capacity of every queue between stages.
+        backpressure: "block" - producers wait for free space, "drop_oldest" - the oldest queued item is dropped
+            (for live sources where fresh frames are more important than complete processing).
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable, int]], queue_size: int = 4, backpressure: str = "block"):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure should be one of {BACKPRESSURE_POLICIES}, but got {backpressure}")
+        self.stages = [(name, fn, max(1, int(workers))) for name, fn, workers in stages]
+        self.queue_size = max(1, int(queue_size))
+        self.backpressure = backpressure
+
+        self.stats: List[StageStats] = []
+        self._dropped = set()
+        self._dropped_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error = None
+        self._started = None
+
+    def _put(self, q: queue.Queue, item, stats: StageStats) -> None:
+        if self.backpressure == "drop_oldest" and item[1] is not _END:
+            while not self._stop.is_set():
+                try:
+                    q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        seq, dropped = q.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if dropped is _END:
+                        # конец потока не выбрасываем
+                        q.put(dropped)
+                        continue
+                    with self._dropped_lock:
+                        self._dropped.add(seq)
+                    with stats.lock:
+                        stats.dropped += 1
+            return
+
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            stats.add_depth(q.qsize())
+            return item
+        return None
+
+    def _items(self, q: queue.Queue, stats: StageStats) -> Iterator[Tuple[int, Any]]:
+        """Yields (seq, item) in the arrival order until the end of the stream."""
+        while True:
+            item = self._get(q, stats)
+            if item is None or item[1] is _END:
+                return
+            yield item
+
+    def _ordered_items(self, q: queue.Queue, stats: StageStats, last: bool) -> Iterator[Tuple[int, Any]]:
+        """Yields (seq, item) in the source order until the end of the stream, dropped items are skipped.
+
+        Args:
+            last: the consumer is the last one, dropped sequence numbers are forgotten.
+        """
+        pending = dict()
+        next_seq = 0
+        for seq, data in self._items(q, stats):
+            pending[seq] = data
+            # восстанавливаем порядок источника, выброшенные элементы пропускаем
+            while True:
+                if next_seq in pending:
+                    yield next_seq, pending.pop(next_seq)
+                    next_seq += 1
+                    continue
+                with self._dropped_lock:
+                    if next_seq in self._dropped:
+                        if last:
+                            self._dropped.discard(next_seq)
+                        next_seq += 1
+                        continue
+                break
+        for seq in sorted(pending):
+            yield seq, pending[seq]
+
+    def _fail(self, e: BaseException) -> None:
+        if self._error is None:
+            self._error = e
+        self._stop.set()
+
+    def _source(self, source: Iterable, out: queue.Queue, stats: StageStats, next_workers: int) -> None:
+        try:
+            iterator = iter(source)
+            seq = 0
+            while not self._stop.is_set():
+                t1 = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.add_item(time.perf_counter() - t1)
+                self._put(out, (seq, item), stats)
+                seq += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(next_workers):
+                self._put(out, (None, _END), stats)
+
+    def _worker(
+        self, fn: Callable, inp: queue.Queue, out: queue.Queue, stats: StageStats, done: Dict, ordered: bool = False
+    ) -> None:
+        try:
+            items = self._ordered_items(inp, stats, last=False) if ordered else self._items(inp, stats)
+            for seq, data in items:
+                t1 = time.perf_counter()
+                data = fn(data)
+                stats.add_item(time.perf_counter() - t1)
+                self._put(out, (seq, data), stats)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with done["lock"]:
+                done["count"] += 1
+                last = done["count"] == stats.workers
+            # последний worker стадии передает конец потока дальше
+            if last:
+                for _ in range(done["next_workers"]):
+                    self._put(out, (None, _END), stats)
+
+    def run(self, source: Iterable) -> Iterator[Any]:
+        """Yields results of the last stage in the source order."""
+        self._started = time.perf_counter()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        source_stats = StageStats("source", 1)
+        self.stats = [source_stats]
+
+        first_workers = self.stages[0][2] if self.stages else 1
+        threads = [
+            threading.Thread(
+                target=self._source, args=(source, queues[0], source_stats, first_workers), name="pipeline-source"
+            )
+        ]
+        for i, (name, fn, workers) in enumerate(self.stages):
+            stats = StageStats(name, workers)
+            self.stats.append(stats)
+            next_workers = self.stages[i + 1][2] if i + 1 < len(self.stages) else 1
+            done = {"lock": threading.Lock(), "count": 0, "next_workers": next_workers}
+            # воркеры предыдущей стадии завершают элементы в произвольном порядке
+            ordered = workers == 1 and i > 0 and self.stages[i - 1][2] > 1
+            for w in range(workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._worker,
+                        args=(fn, queues[i], queues[i + 1], stats, done, ordered),
+                        name=f"pipeline-{name}-{w}",
+                    )
+                )
+
+        sink_stats = StageStats("sink", 1)
+        self.stats.append(sink_stats)
+        for t in threads:
+            t.daemon = True
+            t.start()
+
+        try:
+            for _, data in self._ordered_items(queues[-1], sink_stats, last=True):
+                t1 = time.perf_counter()
+                yield data
+                sink_stats.add_item(time.perf_counter() - t1)
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+            self.log_stats()
+
+        if self._error is not None:
+            raise self._error
+
+    def stats_dict(self) -> List[Dict]:
+        wall_seconds = time.perf_counter() - self._started if self._started is not None else 0.0
+        return [stats.to_dict(wall_seconds) for stats in self.stats]
+
+    def log_stats(self) -> None:
+        for stats in self.stats_dict():
+            logging.info(
+                f"pipeline stage {stats['stage']}: workers={stats['workers']}, items={stats['items']}, "
+                f"dropped={stats['dropped']}, utilization={100 * stats['utilization']:.1f}%, "
+                f"queue_depth avg={stats['queue_depth_avg']:.2f} max={stats['queue_depth_max']}"
+            )
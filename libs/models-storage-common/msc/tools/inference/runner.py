@@ -1,6 +1,8 @@
 from importlib import import_module
+import logging
 from typing import Dict, List, Union
 
+from msc.models import ModelRegistry
 from vuka.core import State
 from vuka.utils import Config, ConfigDict
 
@@ -32,6 +34,10 @@ class Runner:
 
         for k, v in self._config.items():
             if isinstance(v, ConfigDict):
+                # модули выключенных блоков не импортируются
+                if not v.get("turn_on", True):
+                    logging.info(f"block {k} is turned off")
+                    continue
                 try:
                     _block_class = load_class(self._config[k]["module"], self._config[k])
                 except Exception as e:
@@ -39,6 +45,12 @@ class Runner:
 
                 self.pipeline.append(_block_class)
 
+        for stats in ModelRegistry.singleton().stats():
+            logging.info(
+                f"shared model {stats['key']}: refs={stats['refs']}, "
+                f"memory={ModelRegistry.format_bytes(stats['memory_bytes'])}"
+            )
+
     def __call__(self, containers: List) -> List:
         """
         Args:
@@ -51,3 +63,23 @@ class Runner:
         for _cl in self.pipeline:
             containers = _cl(containers)
         return containers
+
+    def preprocess(self, containers: List) -> List:
+        """Runs preprocess hooks of all blocks. Thread-safe, can run concurrently with __call__ of other batches."""
+        for _cl in self.pipeline:
+            containers = _cl.preprocess(containers)
+        return containers
+
+    def decode_size(self) -> Union[int, None]:
+        """The largest input size required by the pipeline blocks. None - images are decoded in full size."""
+        sizes = [size for size in (_cl.decode_size() for _cl in self.pipeline) if size is not None]
+        return max(sizes) if len(sizes) > 0 else None
+
+    def mutates_image(self) -> bool:
+        """Whether any block draws on container.image in place (lazy draw buffers are not safe then)."""
+        return any(_cl.mutates_image() for _cl in self.pipeline)
+
+    def close(self) -> None:
+        for _cl in self.pipeline:
+            _cl.close()
+        self.pipeline = []
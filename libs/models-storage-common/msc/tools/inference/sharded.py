@@ -0,0 +1,142 @@
+from concurrent.futures import as_completed, ProcessPoolExecutor
+import json
+import logging
+import multiprocessing
+from multiprocessing.util import Finalize
+import os
+from pathlib import Path
+import time
+import traceback
+from typing import Dict, List, Tuple
+
+from msc.utils import atomic_write
+
+# Runner воркера, создается один раз на процесс
+_runner = None
+
+# spawn воркеры не наследуют настройки logging родителя, сообщения различаются по имени процесса
+WORKER_LOG_FORMAT = "%(asctime)s %(processName)s %(levelname)s %(message)s"
+
+
+def container_record(container, frame_index: int) -> Dict:
+    objects = [
+        {"type": obj.type, "label": getattr(obj, "label", None), "score": getattr(obj, "score", None)}
+        for obj in container.materialized_objects
+    ]
+    for batch, index in container.pending_classifications:
+        objects.extend(batch.records(index))
+    return {
+        "frame_index": container.frame_index if container.frame_index is not None else frame_index,
+        "objects": objects,
+    }
+
+
+def write_json(path: Path, data) -> None:
+    with atomic_write(path) as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def init_worker(config: str, gpu_id, log_level: int = logging.WARNING) -> None:
+    global _runner
+    logging.basicConfig(level=log_level, format=WORKER_LOG_FORMAT)
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(gpu_id)
+
+    from msc.tools import Runner
+
+    _runner = Runner(config=config, device_id=gpu_id)
+    # atexit в spawn воркерах не вызывается, финализаторы multiprocessing выполняются при штатном завершении воркера
+    Finalize(None, close_worker, exitpriority=10)
+
+
+def close_worker() -> None:
+    """Closes the worker Runner: releases models and caches and logs the statistics of the blocks."""
+    global _runner
+    if _runner is not None:
+        _runner.close()
+        _runner = None
+
+
+def process_video(args, video_path: str, video_name: str) -> Dict:
+    """Processes one video in the worker process and writes its json to output_dir."""
+    from msc.utils.ioutils import DataProvider
+
+    summary = {"video": video_name, "path": video_path, "pid": os.getpid(), "frames": 0, "error": None}
+    t1 = time.time()
+    try:
+        args.input_lazy_draw_buffers = not _runner.mutates_image()
+        provider = DataProvider(args).get_video_provider(video_path, video_name)
+        output_data = provider.output_data
+        for containers in provider():
+            containers = _runner(containers)
+            for container in containers:
+                output_data.extend_data(container_record(container, summary["frames"]))
+                summary["frames"] += 1
+
+        if args.output_dir is not None:
+            output_path = Path(args.output_dir) / f"{video_name}.json"
+            write_json(output_path, output_data.to_json())
+            summary["output"] = str(output_path)
+    except Exception as e:
+        logging.error(f"video {video_path} failed: {e}")
+        summary["error"] = "".join(traceback.format_exception_only(type(e), e)).strip()
+
+    summary["seconds"] = time.time() - t1
+    summary["fps"] = summary["frames"] / max(summary["seconds"], 1e-9)
+    return summary
+
+
+def run_sharded(args, videos: List[Tuple[str, str]]) -> Dict:
+    """Processes whole videos in a pool of num_workers processes.
+
+    Every worker builds its own Runner once. The largest files are submitted first, so the workers finish together.
+    Per-video results are written by the workers, the merged summary is written to output_dir/run_summary.json.
+
+    Args:
+        args: parsed local_inference arguments.
+        videos: [(video path, name relative to the videos root)].
+
+    Returns:
+        run summary.
+    """
+    videos = sorted(videos, key=lambda v: os.path.getsize(v[0]), reverse=True)
+    num_workers = min(args.num_workers, len(videos))
+    logging.info(f"sharded inference: {len(videos)} videos, {num_workers} workers")
+
+    t1 = time.time()
+    results = []
+    # spawn: torch и cv2 не переживают fork с уже созданными потоками
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=context,
+        initializer=init_worker,
+        initargs=(args.config, args.gpu_id, logging.getLogger().getEffectiveLevel()),
+    ) as executor:
+        futures = [executor.submit(process_video, args, path, name) for path, name in videos]
+        for future in as_completed(futures):
+            result = future.result()
+            logging.info(
+                f"video {result['video']}: frames={result['frames']}, {result['fps']:.1f} fps, "
+                f"worker={result['pid']}, error={result['error']}"
+            )
+            results.append(result)
+
+    seconds = time.time() - t1
+    frames = sum(r["frames"] for r in results)
+    summary = {
+        "num_workers": num_workers,
+        "videos": len(results),
+        "failed": sum(r["error"] is not None for r in results),
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / max(seconds, 1e-9),
+        "results": sorted(results, key=lambda r: r["video"]),
+    }
+    logging.info(
+        f"sharded inference: {summary['videos']} videos, {summary['failed']} failed, {frames} frames, "
+        f"{seconds:.1f}s, {summary['fps']:.1f} fps"
+    )
+
+    if args.output_dir is not None:
+        write_json(Path(args.output_dir) / "run_summary.json", summary)
+    return summary
@@ -1,3 +1,3 @@
-from .common import import_classmodule
+from .common import atomic_write, file_fingerprint, import_classmodule, lazy_getattr
 
-__all__ = [import_classmodule]
+__all__ = [atomic_write, import_classmodule, file_fingerprint, lazy_getattr]
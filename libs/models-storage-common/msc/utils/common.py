@@ -1,5 +1,11 @@
+from contextlib import contextmanager
 from importlib import import_module
 import logging
+import os
+from pathlib import Path
+import sys
+import threading
+from typing import Callable, Dict, IO, Iterator, Union
 
 
 def import_classmodule(path):
@@ -11,3 +17,51 @@ def import_classmodule(path):
     except Exception as e:
         logging.warning(f"import_classmodule for <{path}> error: {e}")
         return None
+
+
+def file_fingerprint(path: Union[str, Path]) -> Dict:
+    """Cheap file identity: resolved path, size and modification time."""
+    stat = os.stat(str(path))
+    return {"path": str(Path(path).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+@contextmanager
+def atomic_write(path: Union[str, Path], mode: str = "w") -> Iterator[IO]:
+    """Opens a temporary file next to path and replaces path with it only after the block succeeds.
+
+    Readers and concurrently started workers see either the previous or the complete file, never a partial one. On
+    an exception the temporary file is removed and path is left untouched.
+
+    Args:
+        path: destination file, missing parent directories are created.
+        mode: "w" or "wb".
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def lazy_getattr(package: str, attributes: Dict[str, str]) -> Callable:
+    """Builds a module level __getattr__ (PEP 562) which imports heavy attributes on the first access.
+
+    Args:
+        package: __name__ of the package.
+        attributes: {attribute name: "module.path.ClassName"}.
+    """
+
+    def __getattr__(name):
+        if name not in attributes:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module_name, class_name = attributes[name].rsplit(".", 1)
+        value = getattr(import_module(module_name), class_name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
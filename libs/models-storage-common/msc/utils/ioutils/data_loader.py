@@ -1,15 +1,54 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator as TypingIterator, List
+
+from .datasets import IterableDataset
 from .sampler import BatchSampler, SequentialSampler
 
 
+def chunks(keys: Iterable, batch_size: int, drop_last: bool) -> TypingIterator[List]:
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0 and not drop_last:
+        yield batch
+
+
 class DataLoader(object):
-    def __init__(self, data, batch_size=1, drop_last=False) -> None:
+    """Batches a map-style dataset or an IterableDataset (keys are read lazily).
+
+    Args:
+        data: dataset.
+        batch_size: batch size.
+        drop_last: drop the last incomplete batch.
+        num_workers: threads reading items concurrently. 0 - items are read in the calling thread.
+        prefetch_batches: batches in flight when num_workers > 0.
+    """
+
+    def __init__(self, data, batch_size=1, drop_last=False, num_workers=0, prefetch_batches=2) -> None:
         self.data = data
-        self.batch_sampler = BatchSampler(SequentialSampler(self.data), batch_size, drop_last)
+        self.batch_sampler = None
+        if not isinstance(self.data, IterableDataset):
+            self.batch_sampler = BatchSampler(SequentialSampler(self.data), batch_size, drop_last)
         self.batch_size = batch_size
         self.drop_last = drop_last
+        self.num_workers = num_workers or 0
+        self.prefetch_batches = max(1, prefetch_batches or 1)
 
     def __iter__(self):
-        return Iterator(sampler=self.batch_sampler, data=self.data)
+        if self.batch_sampler is None:
+            sampler, load = chunks(self.data.keys(), self.batch_size, self.drop_last), self.data.load
+        else:
+            sampler, load = self.batch_sampler, self.data.__getitem__
+
+        if self.num_workers > 0:
+            return PoolIterator(
+                sampler=sampler, load=load, num_workers=self.num_workers, prefetch_batches=self.prefetch_batches,
+            )
+        return Iterator(sampler=sampler, load=load)
 
     @property
     def __len__(self):
@@ -17,19 +56,50 @@ class DataLoader(object):
 
 
 class Iterator:
-    def __init__(self, sampler, data):
-        self.data = data
-        self._sampler = list(sampler)
-        self._index = 0
+    def __init__(self, sampler, load):
+        self.load = load
+        self._sampler = iter(sampler)
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        if self._index < len(self._sampler):
-            sampler_idx = self._sampler[self._index]
-            result = list(map(self.data.__getitem__, sampler_idx))
-            self._index += 1
-            return result
-        else:
+        sampler_idx = next(self._sampler)
+        return list(map(self.load, sampler_idx))
+
+
+class PoolIterator:
+    """Reads items of the next prefetch_batches batches in a thread pool, batches are returned in order.
+
+    Useful for datasets which release the GIL while reading (cv2.imread, cv2.resize).
+    """
+
+    def __init__(self, sampler, load, num_workers, prefetch_batches):
+        self.load = load
+        self._sampler = iter(sampler)
+        self._pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="data-loader")
+        self._in_flight = deque()
+        for _ in range(prefetch_batches):
+            self._submit()
+
+    def _submit(self) -> None:
+        sampler_idx = next(self._sampler, None)
+        if sampler_idx is not None:
+            self._in_flight.append([self._pool.submit(self.load, idx) for idx in sampler_idx])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if len(self._in_flight) == 0:
+            self._pool.shutdown(wait=False)
             raise StopIteration
+
+        futures = self._in_flight.popleft()
+        self._submit()
+        return [future.result() for future in futures]
+
+    def __del__(self):
+        pool = getattr(self, "_pool", None)
+        if pool is not None:
+            pool.shutdown(wait=False)
@@ -1,40 +1,60 @@
 import abc
 import codecs
 from copy import deepcopy
+import itertools
 import json
+import logging
 import os.path as osp
 from pathlib import Path
 import pickle
-from typing import List
+from typing import List, Tuple
 
 import cv2
 import glob2
-from torchvision import transforms
 
 from msc.utils.ioutils.data_loader import DataLoader
-from msc.utils.ioutils.datasets import ImageDataset, PickleDataset, RTSPDataset, VideoDataset
+from msc.utils.ioutils.datasets import (
+    frame_step,
+    ImageDataset,
+    ImageStreamDataset,
+    PickleDataset,
+    RTSPDataset,
+    VideoDataset,
+)
+from msc.utils.ioutils.manifest import Manifest
 from msc.utils.ioutils.output_data import OutputData
-from msc.utils.ioutils.transforms import transform_input_size_scale, transform_input_width_height
+from msc.utils.ioutils.scanner import scan_files
+from msc.utils.ioutils.transforms import Compose, transform_input_size_scale, transform_input_width_height
 from vuka.core import Container, State as VukaState
 
 
-def set_images_to_container(frame, container):
+def set_images_to_container(frame, container, lazy_draw_buffers: bool = False):
+    """Sets the frame and the draw buffers of the container.
+
+    Lazy draw buffers are copied from the frame on the first access. They are safe only when no block draws on
+    container.image in place (Runner.mutates_image), otherwise the frame is copied eagerly.
+    """
     if frame is not None:
         container.image = frame
         container.width = frame.shape[1]
         container.height = frame.shape[0]
-        container.image_draw = frame.copy()
-        container.image_draw_zone = frame.copy()
+        if lazy_draw_buffers:
+            container.set_draw_source(frame)
+        else:
+            container.image_draw = frame.copy()
+            container.image_draw_zone = frame.copy()
 
 
-def create_container(frame=None, frame_index=None, file_name=None, editable_config=None, camera_id="0"):
+def create_container(
+    frame=None, frame_index=None, file_name=None, editable_config=None, camera_id="0", lazy_draw_buffers=False
+):
     container = Container()
     container.file_name = file_name
     container.frame_index = frame_index
     container.camera_id = camera_id
     container.camera_name = camera_id
     container.editable_config = editable_config
-    set_images_to_container(frame, container)
+    set_images_to_container(frame, container, lazy_draw_buffers)
     return container
 
 
@@ -48,6 +68,9 @@ class BaseProvider(abc.ABC):
     def output_data(self):
         return self.__output_data
 
+    def commit(self) -> None:
+        """Called by the consumer after all batches of the provider were processed without errors."""
+
 
 class VideoDataProvider(BaseProvider):
     def __init__(self, dataset, args, video_path=None) -> None:
@@ -56,18 +79,28 @@ class VideoDataProvider(BaseProvider):
         super().__init__(dataset=dataset, type="video", file_name=Path(video_path), dir=args.output_dir)
         self.args = args
         self.dataset = dataset
+        self.video_path = str(video_path)
         self.data_loader = DataLoader(data=dataset, batch_size=self.args.input_batch_size)
 
     def __call__(self, *args, **kwargs) -> List:
-        for video_batch in self.data_loader:
-            containers = []
+        # поток предзагрузки останавливается и при досрочном закрытии генератора (ESC, исключения, pipelined)
+        try:
+            for video_batch in self.data_loader:
+                containers = []
 
-            for frame_data in video_batch:
-                container = create_container(
-                    frame=frame_data, file_name="", editable_config=None,
-                )
-                containers.append(container)
-            yield containers
+                for frame_data, frame_index in video_batch:
+                    container = create_container(
+                        frame=frame_data,
+                        frame_index=frame_index,
+                        # источник кадра: по нему блоки с состоянием (SceneGate) отличают видео одной камеры
+                        file_name=self.video_path,
+                        editable_config=None,
+                        lazy_draw_buffers=self.args.input_lazy_draw_buffers,
+                    )
+                    containers.append(container)
+                yield containers
+        finally:
+            self.dataset.release()
 
 
 class RTSPDataProvider(BaseProvider):
@@ -79,49 +112,91 @@ class RTSPDataProvider(BaseProvider):
     def __call__(self, *args, **kwargs) -> List:
         for frame_data in self.dataset.get_data():
             containers = []
-            container = create_container(frame=frame_data, file_name="", editable_config=self.args.editable_config)
+            container = create_container(
+                frame=frame_data,
+                file_name="",
+                editable_config=self.args.editable_config,
+                lazy_draw_buffers=self.args.input_lazy_draw_buffers,
+            )
             containers.append(container)
             yield containers
 
 
 class ImageDataProvider(BaseProvider):
-    def __init__(self, dataset, args) -> None:
+    def __init__(self, dataset, args, manifest=None) -> None:
         super().__init__(dataset=dataset, type="images", file_name=args.input_images_dir, dir=args.input_images_dir)
         self.args = args
         self.dataset = dataset
-        self.data_loader = DataLoader(data=dataset, batch_size=self.args.input_batch_size)
+        self.manifest = manifest
+        self._scanned = False
+        self.data_loader = DataLoader(
+            data=dataset,
+            batch_size=self.args.input_batch_size,
+            num_workers=getattr(self.args, "input_decode_workers", None),
+            prefetch_batches=getattr(self.args, "input_decode_prefetch", None),
+        )
 
     def __call__(self, *args, **kwargs) -> List:
+        self._scanned = False
         for image_batch in self.data_loader:
             containers = []
 
             for frame_data, file_name in image_batch:
+                if frame_data is None:
+                    continue
                 file_name = str(file_name.relative_to(self.args.input_images_dir))
                 container = create_container(
-                    frame=frame_data, file_name=file_name, editable_config=self.args.editable_config,
+                    frame=frame_data,
+                    file_name=file_name,
+                    editable_config=self.args.editable_config,
+                    lazy_draw_buffers=self.args.input_lazy_draw_buffers,
                 )
                 containers.append(container)
-            yield containers
+            if len(containers) > 0:
+                yield containers
+        self._scanned = True
+
+    def commit(self) -> None:
+        # генератор может работать в потоке источника (pipelined): конец чтения еще не значит конец обработки,
+        # поэтому манифест сохраняет потребитель после успешной обработки всех батчей
+        if self.manifest is None:
+            return
+        if not self._scanned:
+            logging.warning(f"manifest <{self.manifest.path}> is not saved: the images were not read completely")
+            return
+        self.manifest.save()
 
 
 class CombinedPickleDataProvider(BaseProvider):
     def __init__(self, pickle_dataset, frame_dataset, args, vuka_state_pickle_dataset=None) -> None:
         super().__init__(dataset=pickle_dataset, type="pickle", file_name=args.input_pickle_path)
         self.args = args
-        self.pickle_data_loader = DataLoader(data=pickle_dataset, batch_size=self.args.input_batch_size)
+        # pickle записи соответствуют кадрам видео и выбираются по индексу кадра (кадры могут пропускаться)
+        self.pickle_dataset = pickle_dataset
+        self.vuka_state_pickle_dataset = vuka_state_pickle_dataset
+        self.frame_dataset = frame_dataset
         self.frame_data_loader = DataLoader(data=frame_dataset, batch_size=self.args.input_batch_size)
-        if vuka_state_pickle_dataset is not None:
-            self.pickle_vuka_data_loader = DataLoader(
-                data=vuka_state_pickle_dataset, batch_size=self.args.input_batch_size
-            )
-        else:
-            self.pickle_vuka_data_loader = None
+
+    def get_frames(self):
+        """Yields [(pickle data, frame, frame index)] batches while there are pickle records for frames."""
+        try:
+            for frame_batch in self.frame_data_loader:
+                batch = [
+                    (self.pickle_dataset[frame_index], frame_data, frame_index)
+                    for frame_data, frame_index in frame_batch
+                    if frame_index < len(self.pickle_dataset)
+                ]
+                if len(batch) == 0:
+                    return
+                yield batch
+        finally:
+            self.frame_dataset.release()
 
     def get_pickle_frame(self):
-        for pickle_batch, frame_batch in zip(self.pickle_data_loader, self.frame_data_loader):
+        for batch in self.get_frames():
             containers = []
 
-            for pickle_data, frame_data in zip(pickle_batch, frame_batch):
+            for pickle_data, frame_data, frame_index in batch:
                 container = pickle.loads(pickle_data)
 
                 container.image = frame_data
@@ -132,11 +207,11 @@ class CombinedPickleDataProvider(BaseProvider):
             yield containers
 
     def __call__(self, *args, **kwargs) -> List:
-        if self.pickle_vuka_data_loader is None:
-            for pickle_batch, frame_batch in zip(self.pickle_data_loader, self.frame_data_loader):
+        if self.vuka_state_pickle_dataset is None:
+            for batch in self.get_frames():
                 containers = []
 
-                for pickle_data, frame_data in zip(pickle_batch, frame_batch):
+                for pickle_data, frame_data, frame_index in batch:
                     container = pickle.loads(pickle_data)
 
                     container.image = frame_data
@@ -148,13 +223,12 @@ class CombinedPickleDataProvider(BaseProvider):
         else:
             if self.args.input_batch_size > 1:
                 raise Exception("Use the data provider with the vuka state when the batch size is 1!")
-            for pickle_batch, vuka_state_batch, frame_batch in zip(
-                self.pickle_data_loader, self.pickle_vuka_data_loader, self.frame_data_loader
-            ):
+            for batch in self.get_frames():
                 containers = []
 
-                for pickle_data, frame_data, vuka_state_data in zip(pickle_batch, frame_batch, vuka_state_batch):
+                for pickle_data, frame_data, frame_index in batch:
                     container = pickle.loads(pickle_data)
+                    vuka_state_data = self.vuka_state_pickle_dataset[frame_index]
 
                     container.image = frame_data
                     container.image_draw = frame_data
@@ -163,7 +237,7 @@ class CombinedPickleDataProvider(BaseProvider):
                     containers.append(container)
 
                     # set state
-                    VukaState().__dict__ = pickle.loads(vuka_state_data).__dict__.copy()
+                    VukaState().__setstate__(pickle.loads(vuka_state_data).__getstate__())
                 yield containers
 
 
@@ -174,8 +248,12 @@ class MultipleVideoDataProvider:
         self.caps = dict()
         self.output_data = OutputData(dir=self.args.output_dir, type="videos_list")
         self.editable_configs = dict()
+        self.steps = dict()
+        self.frame_indices = dict()
         for name in self.video_names:
             self.caps[name] = cv2.VideoCapture(osp.join(args.input_videos_dir, name))
+            self.steps[name] = frame_step(self.args, self.caps[name].get(cv2.CAP_PROP_FPS))
+            self.frame_indices[name] = 0
             if self.args.editable_config is not None and "cameras" in self.args.editable_config:
                 self.editable_configs[name] = self.args.editable_config["cameras"][name]
             else:
@@ -185,13 +263,21 @@ class MultipleVideoDataProvider:
         while 1:
             containers = []
             for video_name, cap in self.caps.items():
+                frame_index = self.frame_indices[video_name]
                 ret, frame_data = cap.read()
+                # пропускаемые кадры только grab'ятся
+                for _ in range(self.steps[video_name] - 1):
+                    if not cap.grab():
+                        break
+                self.frame_indices[video_name] += self.steps[video_name]
                 if ret:
                     container = create_container(
                         frame=frame_data,
+                        frame_index=frame_index,
                         file_name=video_name,
                         editable_config=self.editable_configs[video_name],
                         camera_id=Path(video_name).stem,
+                        lazy_draw_buffers=self.args.input_lazy_draw_buffers,
                     )
                     containers.append(container)
             if len(containers) == 0:
@@ -208,9 +294,17 @@ class DataProvider:
 
         if self.args.input_batch_size is None:
             self.args.input_batch_size = 1
+        if not hasattr(self.args, "input_sort_paths"):
+            self.args.input_sort_paths = True
+        # конфиг камер задается вызывающим кодом, в аргументах командной строки его нет
+        if not hasattr(self.args, "editable_config"):
+            self.args.editable_config = None
+        # ленивые буферы отрисовки включает вызывающий код, знающий блоки пайплайна (Runner.mutates_image)
+        if not hasattr(self.args, "input_lazy_draw_buffers"):
+            self.args.input_lazy_draw_buffers = False
 
         self.images_exts = [".jpg", ".png", ".tif", ".bmp", ".pnm"]
-        self.videos_exts = [".mp4", ".avi", ".mkv", ".asf", "webm", ".mts"]
+        self.videos_exts = [".mp4", ".avi", ".mkv", ".asf", ".webm", ".mts"]
 
         if args.input is not None:  # Recognize input content
             if args.input.starts_with("rtsp"):
@@ -226,34 +320,49 @@ class DataProvider:
             elif Path(args.input).suffix.lower() in [".pickle"]:
                 args.input_pickle_path = args.input
 
+    def is_videos_set(self) -> bool:
+        """True if the input is a set of independent videos (a directory or a glob mask)."""
+        if self.args.input_video_path is not None and self.args.input_pickle_path is None:
+            return "*" in self.args.input_video_path
+        return self.args.input_videos_list is None and self.args.input_videos_dir is not None
+
+    def get_videos_paths(self) -> List[Tuple[str, str]]:
+        """Returns [(video path, name relative to the videos root)] of a directory or a glob mask."""
+        if self.args.input_video_path is not None and "*" in self.args.input_video_path:
+            videos_root = Path(self.args.input_video_path[: self.args.input_video_path.index("*")])
+            if not videos_root.is_dir():
+                videos_root = videos_root.parent
+            videos_paths = glob2.glob(self.args.input_video_path)
+        else:
+            if not Path(self.args.input_videos_dir).exists():
+                raise Exception(f"{self.args.input_videos_dir} is not exists!")
+            videos_root = Path(self.args.input_videos_dir)
+            videos_paths = list(scan_files(self.args.input_videos_dir, self.videos_exts))
+
+        videos_paths = sorted(set(v for v in videos_paths if Path(v).suffix.lower() in self.videos_exts))
+        assert len(videos_paths) > 0, self.args.input_video_path or self.args.input_videos_dir
+        return [(v, str(Path(v).relative_to(videos_root))) for v in videos_paths]
+
+    def get_video_provider(self, video_path: str, video_name: str) -> "VideoDataProvider":
+        video_dataset = VideoDataset(
+            path=video_path,
+            args=self.args,
+            transforms=Compose([transform_input_width_height, transform_input_size_scale]),
+        )
+        return VideoDataProvider(dataset=video_dataset, args=deepcopy(self.args), video_path=video_name)
+
     def get_data(self):
         if self.args.input_video_path is not None and self.args.input_pickle_path is None:
-            if not Path(self.args.input_video_path).exists():
-                raise Exception(f"{self.args.input_video_path} is not exists!")
             if "*" in self.args.input_video_path:
-                video_dir = self.args.input_video_path[self.args.input_video_path.index("*")]
-                videos_paths = []
-                for suffix in self.videos_exts:
-                    videos_paths.extend(Path(self.args.input_video_path).parent.glob(f"*{suffix}"))
-
-                providers = []
-                for v in videos_paths:
-                    video_dataset = VideoDataset(
-                        path=v,
-                        args=self.args,
-                        transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
-                    )
-
-                    video_data_provider = VideoDataProvider(
-                        dataset=video_dataset, args=self.args, video_path=str(Path(v).relative_to(video_dir))
-                    )
-                    providers.append(video_data_provider)
-                return providers
+                return [self.get_video_provider(v, name) for v, name in self.get_videos_paths()]
             else:
+                if not Path(self.args.input_video_path).exists():
+                    raise Exception(f"{self.args.input_video_path} is not exists!")
+
                 video_dataset = VideoDataset(
                     path=self.args.input_video_path,
                     args=self.args,
-                    transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
+                    transforms=Compose([transform_input_width_height, transform_input_size_scale]),
                 )
 
                 return [
@@ -273,7 +382,7 @@ class DataProvider:
             image_dataset = ImageDataset(
                 images=images,
                 args=args,
-                transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
+                transforms=Compose([transform_input_width_height, transform_input_size_scale]),
             )
 
             return [ImageDataProvider(dataset=image_dataset, args=args)]
@@ -289,7 +398,7 @@ class DataProvider:
             video_dataset = VideoDataset(
                 path=self.args.input_video_path,
                 args=self.args,
-                transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
+                transforms=Compose([transform_input_width_height, transform_input_size_scale]),
             )
             pickle_dataset = PickleDataset(path=self.args.input_pickle_path, args=self.args, transform=None)
 
@@ -314,27 +423,34 @@ class DataProvider:
             ]
 
         elif self.args.input_images_dir:
-            images_paths = []
-            for ext in self.images_exts:
-                for image_path in glob2.glob(osp.join(self.args.input_images_dir, "**/*{}".format(ext))):
-                    images_paths.append(image_path)
-            assert len(images_paths) > 0, self.args.input_images_dir
+            # пути читаются лениво: инференс начинается до окончания обхода каталога
+            manifest = None
+            if getattr(self.args, "input_manifest", None) is not None:
+                manifest = Manifest(self.args.input_manifest, trust=self.args.input_manifest_trust).load()
+                images_paths = manifest.scan(self.args.input_images_dir, self.images_exts, self.args.input_sort_paths)
+            else:
+                images_paths = scan_files(self.args.input_images_dir, self.images_exts, sort=self.args.input_sort_paths)
 
-            args = deepcopy(self.args)
-            args.input_images_paths = images_paths
-            images = [Path(x) for x in images_paths]
-            images_dataset = ImageDataset(
+            first_path = next(images_paths, None)
+            if first_path is None and manifest is not None:
+                logging.info(f"no new or changed images in {self.args.input_images_dir}")
+                manifest.save()
+                return []
+            assert first_path is not None, self.args.input_images_dir
+
+            images = (Path(x) for x in itertools.chain([first_path], images_paths))
+            images_dataset = ImageStreamDataset(
                 images=images,
                 args=self.args,
-                transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
+                transforms=Compose([transform_input_width_height, transform_input_size_scale]),
             )
-            return [ImageDataProvider(dataset=images_dataset, args=self.args)]
+            return [ImageDataProvider(dataset=images_dataset, args=self.args, manifest=manifest)]
 
         elif self.args.input_rtsp_url is not None:
             rtsp_dataset = RTSPDataset(
                 path=self.args.input_rtsp_url,
                 args=self.args,
-                transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
+                transforms=Compose([transform_input_width_height, transform_input_size_scale]),
             )
 
             return [RTSPDataProvider(dataset=rtsp_dataset, args=self.args)]
@@ -349,30 +465,7 @@ class DataProvider:
             return providers
 
         elif self.args.input_videos_dir is not None:
-            if not Path(self.args.input_videos_dir).exists():
-                raise Exception(f"{self.args.input_video_path} is not exists!")
-
-            videos_paths = []
-            for ext in self.videos_exts:
-                for video_path in glob2.glob(osp.join(self.args.input_videos_dir, "**/*{}".format(ext))):
-                    videos_paths.append(video_path)
-
-            assert len(videos_paths) > 0, self.args.input_videos_dir
-            providers = []
-            for v in videos_paths:
-                video_dataset = VideoDataset(
-                    path=v,
-                    args=self.args,
-                    transforms=transforms.Compose([transform_input_width_height, transform_input_size_scale]),
-                )
-
-                video_data_provider = VideoDataProvider(
-                    dataset=video_dataset,
-                    args=deepcopy(self.args),
-                    video_path=str(Path(v).relative_to(self.args.input_videos_dir)),
-                )
-                providers.append(video_data_provider)
-            return providers
+            return [self.get_video_provider(v, name) for v, name in self.get_videos_paths()]
         #
         # if self.args.input_coco_json_path is not None:
         #     assert self.args.input_images_dir is not None, "Images root is not set up for coco {}".format(
@@ -1,27 +1,152 @@
 import logging
 from pathlib import Path
 import pickle
+import queue
 import sys
 import threading
 import time
-from typing import List
+from typing import Iterator, List, Union
 
 import cv2
-from torch.utils.data import Dataset
+
+from msc.utils.ioutils.image_reader import imread
+from msc.utils.ioutils.video_index import VideoIndex
+
+# без индекса ключевых кадров короткие переходы вперед выполняются grab'ами, дальние - seek'ом OpenCV
+MAX_GRAB_FORWARD = 64
+# ожидание завершения потока предзагрузки, поток может быть внутри cv2.VideoCapture.read
+PREFETCH_JOIN_TIMEOUT = 5.0
+
+
+def frame_step(args, fps: float) -> int:
+    """Temporal subsampling step: every input_skip_frames-th frame or the step giving input_fps."""
+    if getattr(args, "input_skip_frames", None):
+        return max(1, int(args.input_skip_frames))
+    if getattr(args, "input_fps", None) and fps and fps > 0:
+        return max(1, int(round(fps / float(args.input_fps))))
+    return 1
+
+
+class Dataset(object):
+    """Base map-style dataset (the same interface as torch.utils.data.Dataset, without importing torch)."""
+
+    def __getitem__(self, idx):
+        raise NotImplementedError
+
+
+class IterableDataset(Dataset):
+    """Dataset over a lazy stream of keys of unknown length. DataLoader batches keys() and reads items by load(key)."""
+
+    def keys(self) -> Iterator:
+        raise NotImplementedError
+
+    def load(self, key):
+        raise NotImplementedError
+
+
+class FramePrefetcher(threading.Thread):
+    """Decodes and transforms frames ahead of the consumer in a separate thread.
+
+    cv2.VideoCapture.read releases the GIL, so decoding overlaps with the inference. Frames are kept in a bounded
+    buffer, the end of the stream and decode errors are passed to the consumer through the same buffer.
+
+    Args:
+        read_frame: function returning (ret, frame).
+        size: buffer size in frames.
+    """
+
+    _END = object()
+
+    def __init__(self, read_frame, size: int) -> None:
+        threading.Thread.__init__(self, name="frame-prefetcher", daemon=True)
+        self.read_frame = read_frame
+        self.buffer = queue.Queue(maxsize=max(1, int(size)))
+        self.alive = True
+        self.finished = False
+
+        # заполненность буфера в момент чтения потребителем
+        self.depth_sum = 0
+        self.depth_samples = 0
+        self.empty_count = 0
+
+    def run(self):
+        try:
+            while self.alive:
+                ret, frame = self.read_frame()
+                if not ret:
+                    break
+                self._put(frame)
+        except Exception as e:
+            self._put(e)
+        self._put(self._END)
+
+    def _put(self, item) -> None:
+        while self.alive:
+            try:
+                self.buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def get(self):
+        """Returns the next frame, None after the end of the stream. Re-raises decode errors."""
+        if self.finished:
+            return None
+
+        depth = self.buffer.qsize()
+        self.depth_sum += depth
+        self.depth_samples += 1
+        if depth == 0:
+            self.empty_count += 1
+
+        item = self.buffer.get()
+        if item is self._END:
+            self.finished = True
+            return None
+        if isinstance(item, Exception):
+            self.finished = True
+            raise item
+        return item
+
+    def release(self) -> None:
+        self.alive = False
+
+    def stats(self) -> dict:
+        return {
+            "size": self.buffer.maxsize,
+            "depth_avg": self.depth_sum / max(self.depth_samples, 1),
+            "empty_ratio": self.empty_count / max(self.depth_samples, 1),
+        }
 
 
 class VideoDataset(Dataset):
     def __init__(self, path, args, transforms=None):
         self.args = args
+        self.path = path
         self.cap = cv2.VideoCapture(path)
         self.transforms = transforms
 
+        # число кадров, декодируемых заранее в отдельном потоке. 0 - декодирование в потоке потребителя
+        self.prefetch = int(getattr(args, "input_prefetch", None) or 0)
+        self.prefetcher = None
+
+        # индекс следующего кадра capture и кадра, ожидаемого при последовательном чтении
+        self._position = 0
+        self._next_index = 0
+        # индекс ключевых кадров строится при первом непоследовательном чтении
+        self.index_dir = getattr(args, "input_video_index_dir", None)
+        self._video_index = None
+        self._video_index_loaded = False
+
         if args.input_width is not None:
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(args.input_width))
         if args.input_height is not None:
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(args.input_height))
-        if args.input_fps is not None:
-            self.cap.set(cv2.CAP_PROP_FPS, float(args.input_fps))
+
+        # обрабатывается каждый step-й кадр, CAP_PROP_FPS на файлы не влияет
+        self.step = frame_step(args, self.fps)
+        if self.step > 1:
+            logging.info(f"video <{path}>: every {self.step}-th frame is processed")
 
     @property
     def width(self):
@@ -40,16 +165,108 @@ class VideoDataset(Dataset):
         return len(self)
 
     def __len__(self):
-        return int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) + self.step - 1) // self.step
 
-    def __getitem__(self, idx):
+    @property
+    def video_index(self) -> Union[VideoIndex, None]:
+        """Keyframe index of the video, None if keyframes can not be obtained (without PyAV)."""
+        if not self._video_index_loaded:
+            self._video_index = VideoIndex.load_or_build(str(self.path), self.index_dir)
+            self._video_index_loaded = True
+        return self._video_index
+
+    def seek(self, idx: int) -> None:
+        """Moves the capture so that the next read returns the frame idx.
+
+        The capture is set to the nearest keyframe before idx and the frames up to idx are grabbed (not converted).
+        Seeking is skipped if idx is reachable from the current position without passing a keyframe. Without the
+        keyframe index short forward moves are grabbed and other moves use CAP_PROP_POS_FRAMES.
+        """
+        if idx == self._position:
+            return
+
+        index = self.video_index
+        keyframe = index.keyframe_before(idx) if index is not None else None
+        if keyframe is None:
+            if not self._position < idx <= self._position + MAX_GRAB_FORWARD:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+                self._position = idx
+        elif not keyframe <= self._position < idx:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self._position = keyframe
+
+        while self._position < idx:
+            if not self.cap.grab():
+                break
+            self._position += 1
+
+    def read_frame(self):
+        """Reads the next kept frame. Returns (ret, [frame, frame index in the video])."""
+        # пропускаемые кадры только grab'ятся: без retrieve и конвертации в BGR
+        while self._position % self.step != 0:
+            if not self.cap.grab():
+                return False, [None, self._position]
+            self._position += 1
+
+        frame_index = self._position
         ret, frame = self.cap.read()
+        if ret:
+            self._position += 1
 
-        if self.transforms:
+        if ret and self.transforms:
             results = {"frame": frame, "args": self.args}
             results = self.transforms(results)
             frame = results.get("frame")
-        return frame
+        return ret, [frame, frame_index]
+
+    def __getitem__(self, idx):
+        frame_index = idx * self.step
+        # sequential reads keep the fast path, other reads seek
+        if idx != self._next_index:
+            self.stop_prefetcher()
+            self.seek(frame_index)
+        self._next_index = idx + 1
+
+        if self.prefetch > 0:
+            if self.prefetcher is None:
+                self.prefetcher = FramePrefetcher(self.read_frame, self.prefetch)
+                self.prefetcher.start()
+            item = self.prefetcher.get()
+            if self.prefetcher.finished:
+                self.log_prefetch_stats()
+                self.stop_prefetcher()
+            return item if item is not None else [None, frame_index]
+
+        ret, item = self.read_frame()
+        return item
+
+    def stop_prefetcher(self, timeout: float = None) -> bool:
+        """Stops the prefetch thread. Returns False if the thread did not finish in timeout seconds."""
+        if self.prefetcher is None:
+            return True
+        # буферизованные кадры после seek не нужны
+        self.prefetcher.release()
+        self.prefetcher.join(timeout)
+        if self.prefetcher.is_alive():
+            logging.warning(f"video prefetch <{self.path}>: the prefetch thread did not stop in {timeout}s")
+            return False
+        self.prefetcher = None
+        return True
+
+    def log_prefetch_stats(self) -> None:
+        if self.prefetcher is not None:
+            stats = self.prefetcher.stats()
+            logging.info(
+                f"video prefetch <{self.path}>: buffer={stats['size']}, depth avg={stats['depth_avg']:.2f}, "
+                f"consumer waited on empty buffer {100 * stats['empty_ratio']:.1f}%"
+            )
+
+    def release(self) -> None:
+        """Stops and joins the prefetch thread, then releases the capture. Safe to call several times."""
+        self.log_prefetch_stats()
+        # capture нельзя освобождать, пока поток предзагрузки читает из него
+        if self.stop_prefetcher(PREFETCH_JOIN_TIMEOUT):
+            self.cap.release()
 
 
 class ImageDataset(Dataset):
@@ -58,6 +275,12 @@ class ImageDataset(Dataset):
         self.args = args
         self.transforms = transforms
 
+        # минимальный размер изображения, нужный моделям (--input_reduced_decode). Ресайз аргументами ожидает
+        # полный размер
+        self.decode_size = getattr(args, "input_decode_size", None)
+        if args.input_size_scale or args.input_width or args.input_height:
+            self.decode_size = None
+
     @property
     def width(self):
         return None
@@ -78,8 +301,14 @@ class ImageDataset(Dataset):
         return len(self.images)
 
     def __getitem__(self, idx: int):
-        image_path = self.images[idx]
-        frame = cv2.imread(str(image_path))
+        return self.load(self.images[idx])
+
+    def load(self, image_path: Path):
+        frame = imread(str(image_path), self.decode_size)
+        if frame is None:
+            # битые и нечитаемые файлы пропускаются провайдером
+            logging.warning(f"image <{image_path}> can not be read, skipped")
+            return [None, image_path]
 
         if self.transforms:
             results = {"frame": frame, "args": self.args}
@@ -88,6 +317,16 @@ class ImageDataset(Dataset):
         return [frame, image_path]
 
 
+class ImageStreamDataset(ImageDataset, IterableDataset):
+    """ImageDataset over a lazy stream of paths: decoding starts before the directory scan is finished."""
+
+    def keys(self) -> Iterator:
+        return iter(self.images)
+
+    def __len__(self) -> int:
+        raise TypeError("the length of a stream dataset is unknown")
+
+
 class PickleDataset(Dataset):
     def __init__(self, path, args=None, transform=None):
         self.args = args
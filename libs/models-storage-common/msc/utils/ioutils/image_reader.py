@@ -0,0 +1,43 @@
+from typing import Union
+
+import cv2
+
+# JPEG декодируется сразу в уменьшенном размере (масштабирование в DCT области)
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def decode_flag(path: str, min_size: Union[int, None] = None) -> int:
+    """Selects the largest reduced decode factor which keeps the longer image side >= min_size.
+
+    Only the image header is read. Non-JPEG images and images which can not be inspected are decoded in full size.
+    """
+    if not min_size:
+        return cv2.IMREAD_COLOR
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return cv2.IMREAD_COLOR
+
+    try:
+        with Image.open(path) as image:
+            if image.format != "JPEG":
+                return cv2.IMREAD_COLOR
+            width, height = image.size
+    except Exception:
+        # ошибку чтения сообщит cv2.imread
+        return cv2.IMREAD_COLOR
+
+    for factor, flag in REDUCED_FLAGS:
+        if max(width, height) // factor >= min_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def imread(path: str, min_size: Union[int, None] = None):
+    """cv2.imread which decodes large JPEGs at 1/2, 1/4 or 1/8 scale if the model needs only min_size pixels.
+
+    The returned frame is the reduced one: everything built from it (container.image, width and height, drawn and
+    saved outputs) has the reduced resolution. The reduced decode is enabled only by --input_reduced_decode.
+    """
+    return cv2.imread(path, decode_flag(path, min_size))
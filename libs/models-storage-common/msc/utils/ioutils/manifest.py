@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+from msc.utils import atomic_write
+
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """Files of a directory processed by previous runs: relative path -> [size, mtime_ns].
+
+    Directories are stored with their mtime and subdirectories. A directory mtime changes when entries are added,
+    removed or renamed in it, so in the trust mode unchanged directories are not listed and their files are not
+    stat-ed. Files rewritten in place are found only in the default (stat-diff) mode.
+
+    Args:
+        path: manifest json path.
+        trust: do not list directories and stat files which did not change since the previous run.
+    """
+
+    def __init__(self, path: str, trust: bool = False) -> None:
+        self.path = Path(path).expanduser()
+        self.trust = trust
+        self.root = None
+        self.files: Dict[str, list] = dict()
+        self.dirs: Dict[str, dict] = dict()
+
+        # состояние текущего обхода, сохраняется после обработки
+        self._files: Dict[str, list] = dict()
+        self._dirs: Dict[str, dict] = dict()
+        self.stats = {"new": 0, "changed": 0, "unchanged": 0, "skipped_dirs": 0}
+
+    def load(self) -> "Manifest":
+        if not self.path.exists():
+            return self
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.root = data["root"]
+                self.files = data["files"]
+                self.dirs = data["dirs"]
+        except Exception as e:
+            logging.warning(f"manifest <{self.path}> can not be loaded, all files are processed: {e}")
+        return self
+
+    def save(self) -> None:
+        """Atomically replaces the manifest with the state of the last scan."""
+        data = {"version": MANIFEST_VERSION, "root": self.root, "files": self._files, "dirs": self._dirs}
+        with atomic_write(self.path) as f:
+            json.dump(data, f)
+        logging.info(
+            f"manifest <{self.path}>: {len(self._files)} files, {self.stats['new']} new, "
+            f"{self.stats['changed']} changed, {self.stats['skipped_dirs']} unchanged directories skipped"
+        )
+
+    def scan(self, root: str, exts: Iterable[str], sort: bool = True) -> Iterator[str]:
+        """Lazily yields paths of new and changed files with the given extensions under root."""
+        exts = tuple(ext.lower() for ext in exts)
+        resolved_root = str(Path(root).resolve())
+        if self.root is not None and self.root != resolved_root:
+            logging.warning(f"manifest <{self.path}> was built for <{self.root}>, all files are processed")
+            self.files, self.dirs = dict(), dict()
+        self.root = resolved_root
+
+        stack = [""]
+        while stack:
+            relative_dir = stack.pop()
+            directory = os.path.join(root, relative_dir)
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError as e:
+                logging.warning(f"manifest scan: directory <{directory}> is skipped: {e}")
+                continue
+
+            known = self.dirs.get(relative_dir)
+            if self.trust and known is not None and known["mtime_ns"] == mtime_ns:
+                # каталог не менялся: файлы и подкаталоги берутся из манифеста
+                self.stats["skipped_dirs"] += 1
+                self._dirs[relative_dir] = known
+                prefix = os.path.join(relative_dir, "") if relative_dir else ""
+                for name in known["files"]:
+                    key = prefix + name
+                    if key in self.files:
+                        self._files[key] = self.files[key]
+                        self.stats["unchanged"] += 1
+                stack.extend(reversed(known["subdirs"]))
+                continue
+
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name) if sort else list(it)
+            except OSError as e:
+                logging.warning(f"manifest scan: directory <{directory}> is skipped: {e}")
+                continue
+
+            subdirs, files = [], []
+            for entry in entries:
+                key = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                try:
+                    if entry.is_dir():
+                        subdirs.append(key)
+                        continue
+                    if not entry.name.lower().endswith(exts):
+                        continue
+                    stat = entry.stat()
+                except OSError as e:
+                    logging.warning(f"manifest scan: <{entry.path}> is skipped: {e}")
+                    continue
+
+                files.append(entry.name)
+                state = [stat.st_size, stat.st_mtime_ns]
+                self._files[key] = state
+                previous = self.files.get(key)
+                if previous == state:
+                    self.stats["unchanged"] += 1
+                    continue
+                self.stats["new" if previous is None else "changed"] += 1
+                yield entry.path
+
+            self._dirs[relative_dir] = {"mtime_ns": mtime_ns, "subdirs": subdirs, "files": files}
+            stack.extend(reversed(subdirs))
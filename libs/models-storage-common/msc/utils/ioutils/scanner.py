@@ -0,0 +1,44 @@
+import logging
+import os
+from typing import Iterable, Iterator
+
+
+def scan_files(root: str, exts: Iterable[str], recursive: bool = True, sort: bool = True) -> Iterator[str]:
+    """Lazily yields paths of files with the given extensions in a single pass over the tree.
+
+    Args:
+        root: directory to scan.
+        exts: extensions with a dot, compared case-insensitively.
+        recursive: scan subdirectories.
+        sort: yield entries of every directory sorted by name (directories are visited in the same order).
+            Otherwise the os.scandir order is used, which is faster but depends on the filesystem.
+
+    Yields:
+        file paths joined with root.
+    """
+    exts = tuple(ext.lower() for ext in exts)
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it) if sort else it
+                if sort:
+                    entries.sort(key=lambda e: e.name)
+
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if recursive:
+                                subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(exts):
+                            yield entry.path
+                    except OSError as e:
+                        logging.warning(f"scan: <{entry.path}> is skipped: {e}")
+        except OSError as e:
+            logging.warning(f"scan: directory <{directory}> is skipped: {e}")
+            continue
+
+        # обход в глубину: первая по порядку поддиректория обрабатывается следующей
+        stack.extend(reversed(subdirs))
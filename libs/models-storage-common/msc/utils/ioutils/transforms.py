@@ -1,6 +1,18 @@
 import cv2
 
 
+class Compose:
+    """Composes several transforms together (the same as torchvision.transforms.Compose)."""
+
+    def __init__(self, transforms):
+        self.transforms = transforms
+
+    def __call__(self, data):
+        for t in self.transforms:
+            data = t(data)
+        return data
+
+
 def transform_input_width_height(data):
     frame = data.get("frame")
     args = data.get("args")
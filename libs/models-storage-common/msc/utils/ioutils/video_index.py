@@ -0,0 +1,126 @@
+from bisect import bisect_right
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import List, Union
+
+from msc.utils import atomic_write
+
+DEFAULT_VIDEO_INDEX_DIR = "~/.cache/msc/video_index"
+INDEX_VERSION = 1
+
+# хэшируются начало и конец файла: дешево даже для многочасовых записей
+FINGERPRINT_SAMPLE_BYTES = 1 << 20
+
+
+def content_fingerprint(path: Union[str, Path], sample_bytes: int = FINGERPRINT_SAMPLE_BYTES) -> str:
+    """Content fingerprint of a large file: size plus blake2b of its first and last sample_bytes."""
+    size = os.path.getsize(str(path))
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(str(path), "rb") as f:
+        h.update(f.read(sample_bytes))
+        if size > sample_bytes:
+            f.seek(max(sample_bytes, size - sample_bytes))
+            h.update(f.read(sample_bytes))
+    return h.hexdigest()
+
+
+class VideoIndex:
+    """Frame index of a video file: presentation timestamps and keyframe positions in presentation order.
+
+    Args:
+        pts: presentation timestamps of frames in seconds.
+        keyframes: sorted frame indices of keyframes.
+        backend: "pyav".
+    """
+
+    def __init__(self, pts: List[float], keyframes: Union[List[int], None], backend: str) -> None:
+        self.pts = pts
+        self.keyframes = keyframes
+        self.backend = backend
+
+    def __len__(self):
+        return len(self.pts)
+
+    def keyframe_before(self, idx: int) -> Union[int, None]:
+        """The nearest keyframe at or before the frame idx. None if keyframes are unknown."""
+        if not self.keyframes:
+            return None
+        i = bisect_right(self.keyframes, idx)
+        return self.keyframes[i - 1] if i > 0 else 0
+
+    @staticmethod
+    def build_pyav(path: str) -> "VideoIndex":
+        # only demuxing, packets are not decoded
+        import av
+
+        with av.open(path) as container:
+            stream = container.streams.video[0]
+            packets = []
+            for packet in container.demux(stream):
+                if packet.size == 0 or packet.pts is None:
+                    continue
+                packets.append((float(packet.pts * stream.time_base), bool(packet.is_keyframe)))
+
+        # пакеты идут в порядке декодирования, кадры нумеруются в порядке показа
+        packets.sort(key=lambda p: p[0])
+        keyframes = [i for i, (_, is_keyframe) in enumerate(packets) if is_keyframe]
+        return VideoIndex([pts for pts, _ in packets], keyframes, "pyav")
+
+    @classmethod
+    def build(cls, path: str) -> Union["VideoIndex", None]:
+        """Builds the index with PyAV. None if keyframes can not be obtained (PyAV is missing or fails)."""
+        try:
+            return cls.build_pyav(path)
+        except ImportError:
+            logging.debug("PyAV is not installed, video seeks use CAP_PROP_POS_FRAMES")
+        except Exception as e:
+            logging.warning(f"PyAV can not index <{path}>, video seeks use CAP_PROP_POS_FRAMES: {e}")
+        return None
+
+    @classmethod
+    def load_or_build(cls, path: str, cache_dir: Union[str, None] = None) -> Union["VideoIndex", None]:
+        """Loads the index from cache_dir or builds it once and stores it with the file content fingerprint.
+
+        Returns None (nothing is cached) if keyframes can not be obtained.
+        """
+        fingerprint = content_fingerprint(path)
+        cache_path = Path(cache_dir or DEFAULT_VIDEO_INDEX_DIR).expanduser() / f"{fingerprint}.json"
+
+        if cache_path.exists():
+            try:
+                with open(cache_path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION and data.get("fingerprint") == fingerprint:
+                    return VideoIndex(data["pts"], data["keyframes"], data["backend"])
+            except Exception as e:
+                logging.warning(f"video index <{cache_path}> can not be loaded: {e}")
+
+        t1 = time.time()
+        index = cls.build(path)
+        if index is None:
+            return None
+        t2 = time.time()
+        logging.info(
+            f"video index <{path}>: {len(index)} frames, {len(index.keyframes)} keyframes, "
+            f"{index.backend}, {t2 - t1:.2f}s"
+        )
+
+        data = {
+            "version": INDEX_VERSION,
+            "fingerprint": fingerprint,
+            "path": str(path),
+            "backend": index.backend,
+            "pts": index.pts,
+            "keyframes": index.keyframes,
+        }
+        try:
+            with atomic_write(cache_path) as f:
+                json.dump(data, f)
+        except OSError as e:
+            logging.warning(f"video index <{cache_path}> can not be saved: {e}")
+        return index
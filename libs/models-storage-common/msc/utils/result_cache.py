@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, Union
+
+import numpy as np
+
+
+def array_digest(data: np.ndarray, salt: bytes = b"") -> bytes:
+    """Fast content hash of a decoded image: blake2b of the shape, dtype and pixels."""
+    h = hashlib.blake2b(salt, digest_size=16)
+    h.update(f"{data.shape}{data.dtype}".encode())
+    h.update(np.ascontiguousarray(data).data)
+    return h.digest()
+
+
+class ResultCache:
+    """Persistent LRU cache of model results in a local sqlite database.
+
+    The database is bounded by the total size of stored values, the least recently used entries are evicted.
+    Several processes can share one database file.
+
+    Args:
+        path: sqlite database path.
+        max_size_mb: size bound of the stored values.
+        fingerprint: pipeline/model fingerprint, entries of another fingerprint are never returned.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size_mb: float = 512, fingerprint: str = "") -> None:
+        self.path = Path(path).expanduser()
+        self.max_bytes = int(max_size_mb * 2 ** 20)
+        self.salt = hashlib.blake2b(fingerprint.encode(), digest_size=16).digest()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, value TEXT, size INTEGER, atime REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_atime ON results (atime)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def key(self, data: np.ndarray) -> bytes:
+        return array_digest(data, self.salt)
+
+    def get(self, key: bytes) -> Any:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE results SET atime = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: bytes, value: Any) -> None:
+        value = json.dumps(value)
+        with self._lock:
+            # перезапись ключа заменяет размер прежнего значения
+            row = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, atime) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._size += len(value) - (row[0] if row is not None else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        # пересчет размера: базу могут заполнять и другие процессы
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        while self._size > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM results ORDER BY atime LIMIT 256").fetchall()
+            if len(rows) == 0:
+                break
+            # удаляются только самые старые записи, необходимые для возврата в границу размера
+            keys = []
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                keys.append((key,))
+                self._size -= size
+            self._db.executemany("DELETE FROM results WHERE key = ?", keys)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+        logging.info(
+            f"result cache <{self.path}>: hits={self.hits}, misses={self.misses}, "
+            f"hit rate={100 * self.hit_rate:.1f}%, size={self._size / 2 ** 20:.1f}MB"
+        )
@@ -0,0 +1,68 @@
+import builtins
+from collections import defaultdict
+import sys
+import time
+from typing import List, Tuple
+
+
+class StartupReport:
+    """Collects where the startup time goes: imports of top-level packages and startup phases.
+
+    Import time is cumulative and is attributed to the top-level package of the outermost import, e.g. numpy imported
+    by cv2 is counted in cv2.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.imports = defaultdict(float)
+        self.phases: List[Tuple[str, float]] = []
+        self._last_mark = self.start
+        self._depth = 0
+        self._original_import = None
+
+    def install(self) -> "StartupReport":
+        if self._original_import is not None:
+            return self
+        self._original_import = builtins.__import__
+        original_import = self._original_import
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level != 0 or self._depth > 0 or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+
+            self._depth += 1
+            t1 = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                self.imports[name.split(".")[0]] += time.perf_counter() - t1
+                self._depth -= 1
+
+        builtins.__import__ = timed_import
+        return self
+
+    def uninstall(self) -> None:
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, phase: str) -> None:
+        """Closes the current startup phase."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last_mark))
+        self._last_mark = now
+
+    def report(self, top: int = 20) -> str:
+        total = time.perf_counter() - self.start
+        lines = [f"startup report: {total:.3f}s total"]
+        lines.append("  phases:")
+        for phase, seconds in self.phases:
+            lines.append(f"    {phase:<24} {seconds:8.3f}s {100 * seconds / max(total, 1e-9):5.1f}%")
+        lines.append(f"  imports (top {top}, cumulative):")
+        for name, seconds in sorted(self.imports.items(), key=lambda x: -x[1])[:top]:
+            lines.append(f"    {name:<24} {seconds:8.3f}s {100 * seconds / max(total, 1e-9):5.1f}%")
+        return "\n".join(lines)
+
+    def finish(self) -> None:
+        self.uninstall()
+        print(self.report(), file=sys.stderr)
@@ -12,7 +12,7 @@ DESCRIPTION = "models-storage-common. DL block implementation for train/inferenc
 URL = ""
 EMAIL = "maxfashko@gmail.com"
 AUTHOR = "Maksim Koriukin"
-REQUIRES_PYTHON = ">=3.6.0"
+REQUIRES_PYTHON = ">=3.7.0"
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 
 
@@ -50,6 +50,7 @@ def load_version():
 # Specific dependencies.
 extras = {
     "x86-64": load_requirements("requirements/requirements-x86-64.txt"),
+    "video": load_requirements("requirements/requirements-video.txt"),
 }
 
 # Meta dependency groups.
@@ -94,7 +95,6 @@ setup(
         "Topic :: Scientific/Engineering :: Information Analysis",
         # Programming
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: Implementation :: CPython",
     ]
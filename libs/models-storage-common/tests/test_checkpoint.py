@@ -0,0 +1,49 @@
+import argparse
+
+import torch
+from torch import nn
+
+from msc.models.classifiers.checkpoint import assign_state_dict, load_state_dict
+
+
+def make_model():
+    torch.manual_seed(0)
+    return nn.Linear(4, 2)
+
+
+def assert_same_weights(state, model):
+    assert set(state) == {"weight", "bias"}
+    for name, value in model.state_dict().items():
+        assert torch.equal(state[name], value)
+
+
+def test_zip_state_dict(tmp_path):
+    model = make_model()
+    torch.save(model.state_dict(), str(tmp_path / "w.pth"))
+
+    assert_same_weights(load_state_dict(tmp_path / "w.pth"), model)
+
+
+def test_legacy_checkpoint_is_not_memory_mapped(tmp_path):
+    model = make_model()
+    torch.save(model.state_dict(), str(tmp_path / "w.pth"), _use_new_zipfile_serialization=False)
+
+    assert_same_weights(load_state_dict(tmp_path / "w.pth"), model)
+
+
+def test_training_checkpoint_with_objects(tmp_path):
+    model = nn.DataParallel(make_model())
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    checkpoint = {
+        "epoch": 3,
+        "args": argparse.Namespace(lr=0.1, arch="resnet18"),
+        "state_dict": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+    }
+    torch.save(checkpoint, str(tmp_path / "train.pth"))
+
+    state = load_state_dict(tmp_path / "train.pth")
+
+    # префикс DataParallel снимается
+    assert_same_weights(state, model.module)
+    assert_same_weights(assign_state_dict(make_model(), state).state_dict(), model.module)
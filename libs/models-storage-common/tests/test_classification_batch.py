@@ -0,0 +1,117 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from vuka.core import ClassificationBatch, Container, LabelTable
+
+LABELS = LabelTable(["cat", "dog", "bird"])
+
+
+def assert_predictions(batch, index, expected):
+    predictions = batch.predictions(index)
+    assert [label_id for label_id, _ in predictions] == [label_id for label_id, _ in expected]
+    assert [score for _, score in predictions] == pytest.approx([score for _, score in expected])
+
+
+def make_batch():
+    # 3 выхода модели для контейнеров 0 и 2, контейнер 1 - попадание в кэш
+    top_scores = np.array([[0.7, 0.2], [0.9, 0.05]], dtype=np.float32)
+    top_ids = np.array([[1, 0], [2, 1]], dtype=np.int32)
+    keep = top_scores > 0.1
+    return ClassificationBatch.from_top_k(
+        top_scores, top_ids, keep, LABELS, rows=[0, 2], size=3, predictions={1: [(0, 0.6)]}
+    )
+
+
+def test_label_table_lookups():
+    labels = LabelTable.from_mapping({0: "cat", 2: "bird"})
+
+    assert len(labels) == 3
+    assert labels.name(1) is None
+    assert labels.id("bird") == 2
+    assert labels.ids(["bird", "cat"]).tolist() == [2, 0]
+    assert labels[np.array([2, 0])].tolist() == ["bird", "cat"]
+    with pytest.raises(KeyError):
+        labels.id("dog")
+
+
+def test_label_table_is_immutable():
+    with pytest.raises(AttributeError):
+        LABELS.names = None
+    with pytest.raises(ValueError):
+        LABELS.names[0] = "tiger"
+
+
+def test_label_table_pickle_round_trip():
+    labels = pickle.loads(pickle.dumps(LABELS))
+
+    assert labels.names.tolist() == LABELS.names.tolist()
+    assert labels.id("dog") == 1
+    # имена интернируются, одинаковые строки - один объект
+    assert labels.name(0) is LABELS.name(0)
+
+
+def test_from_top_k_groups_rows_by_container():
+    batch = make_batch()
+
+    assert len(batch) == 4
+    assert batch.size == 3
+    assert_predictions(batch, 0, [(1, 0.7), (0, 0.2)])
+    assert_predictions(batch, 1, [(0, 0.6)])
+    assert_predictions(batch, 2, [(2, 0.9)])
+    assert batch.label_names(0).tolist() == ["dog", "cat"]
+    assert batch.label_counts().tolist() == [2, 1, 1]
+
+
+def test_top_k_of_containers_without_inference():
+    batch = make_batch()
+
+    assert batch.top_k_label_id.tolist() == [[1, 0], [-1, -1], [2, 1]]
+    assert np.isnan(batch.top_k_score[1]).all()
+
+
+def test_records_and_objects_match():
+    batch = make_batch()
+
+    records = batch.records(0)
+    objects = batch.objects(0)
+
+    assert [record["label"] for record in records] == ["dog", "cat"]
+    assert [obj.label for obj in objects] == ["dog", "cat"]
+    assert [obj.label_id for obj in objects] == [1, 0]
+    assert [obj.score for obj in objects] == pytest.approx([record["score"] for record in records])
+
+
+def test_batch_pickle_round_trip():
+    batch = pickle.loads(pickle.dumps(make_batch()))
+
+    assert_predictions(batch, 0, [(1, 0.7), (0, 0.2)])
+    assert batch.rows(2) == slice(3, 4)
+    assert batch.labels.id("bird") == 2
+
+
+def test_container_objects_are_created_on_first_access():
+    batch = make_batch()
+    container = Container()
+    container.camera_id = "cam"
+    container.add_classification(batch, 0)
+
+    assert container.materialized_objects == []
+    assert len(container.pending_classifications) == 1
+
+    objects = container.objects
+    assert [obj.label for obj in objects] == ["dog", "cat"]
+    assert all(obj.camera_id == "cam" for obj in objects)
+    assert container.pending_classifications == []
+    # повторное обращение не создает объекты заново
+    assert container.objects is objects and len(objects) == 2
+
+
+def test_container_pickle_keeps_classifications():
+    container = Container()
+    container.add_classification(make_batch(), 2)
+
+    container = pickle.loads(pickle.dumps(container))
+
+    assert [(obj.label, obj.label_id) for obj in container.objects] == [("bird", 2)]
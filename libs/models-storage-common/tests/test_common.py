@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from msc.utils import atomic_write
+
+
+def test_atomic_write_creates_parents(tmp_path):
+    path = tmp_path / "a" / "b" / "data.json"
+
+    with atomic_write(path) as f:
+        f.write("{}")
+
+    assert path.read_text() == "{}"
+    assert os.listdir(str(path.parent)) == ["data.json"]
+
+
+def test_atomic_write_keeps_previous_file_on_error(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"previous")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path, "wb") as f:
+            f.write(b"partial")
+            raise RuntimeError("write failed")
+
+    assert path.read_bytes() == b"previous"
+    assert os.listdir(str(tmp_path)) == ["data.bin"]
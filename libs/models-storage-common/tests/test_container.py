@@ -0,0 +1,72 @@
+import pickle
+
+import numpy as np
+
+from msc.utils.ioutils.data_provider import create_container
+from vuka.core import Container
+
+
+def frame():
+    return np.zeros((4, 6, 3), dtype=np.uint8)
+
+
+def test_eager_buffers_do_not_see_writes_to_image():
+    container = create_container(frame=frame())
+
+    container.image[0, 0] = 255
+
+    assert container.is_draw_materialized("image_draw")
+    assert container.image_draw[0, 0].tolist() == [0, 0, 0]
+    assert container.image_draw_zone[0, 0].tolist() == [0, 0, 0]
+
+
+def test_lazy_buffers_are_copied_on_first_access():
+    image = frame()
+    container = create_container(frame=image, lazy_draw_buffers=True)
+
+    assert not container.is_draw_materialized("image_draw")
+    assert not container.is_draw_materialized("image_draw_zone")
+
+    draw = container.image_draw
+    assert container.is_draw_materialized("image_draw")
+    assert not container.is_draw_materialized("image_draw_zone")
+    assert draw is not image
+    assert container.image_draw is draw
+
+    # буферы независимы от кадра и друг от друга
+    draw[0, 0] = 255
+    assert image[0, 0].tolist() == [0, 0, 0]
+    assert container.image_draw_zone[0, 0].tolist() == [0, 0, 0]
+
+
+def test_assigned_buffer_is_kept():
+    container = create_container(frame=frame(), lazy_draw_buffers=True)
+    buffer = frame()
+
+    container.image_draw = buffer
+
+    assert container.is_draw_materialized("image_draw")
+    assert container.image_draw is buffer
+
+
+def test_draw_buffer_stats_count_copies():
+    before = Container.draw_buffer_stats()
+    container = create_container(frame=frame(), lazy_draw_buffers=True)
+    container.image_draw
+    after = Container.draw_buffer_stats()
+
+    assert after["deferred"] - before["deferred"] == 2
+    assert after["materialized"] - before["materialized"] == 1
+    assert after["saved_bytes"] - before["saved_bytes"] == frame().nbytes
+
+
+def test_pickle_keeps_lazy_buffers_lazy():
+    container = create_container(frame=frame(), lazy_draw_buffers=True)
+    container.image_draw[0, 0] = 255
+
+    container = pickle.loads(pickle.dumps(container))
+
+    assert container.is_draw_materialized("image_draw")
+    assert container.image_draw[0, 0].tolist() == [255, 255, 255]
+    assert not container.is_draw_materialized("image_draw_zone")
+    assert container.image_draw_zone[0, 0].tolist() == [0, 0, 0]
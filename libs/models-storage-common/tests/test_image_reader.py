@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+
+from msc.tools.inference.local_inference import parse_args
+from msc.utils.ioutils.image_reader import imread
+
+
+def write_image(path, width=800, height=600):
+    cv2.imwrite(str(path), np.random.RandomState(0).randint(0, 255, (height, width, 3), dtype=np.uint8))
+    return str(path)
+
+
+def test_full_size_without_min_size(tmp_path):
+    path = write_image(tmp_path / "a.jpg")
+
+    assert imread(path).shape == (600, 800, 3)
+
+
+def test_reduced_jpeg_keeps_min_size(tmp_path):
+    path = write_image(tmp_path / "a.jpg")
+
+    assert imread(path, min_size=100).shape == (75, 100, 3)
+    assert imread(path, min_size=224).shape == (300, 400, 3)
+    assert imread(path, min_size=1000).shape == (600, 800, 3)
+
+
+def test_png_is_decoded_in_full_size(tmp_path):
+    path = write_image(tmp_path / "a.png")
+
+    assert imread(path, min_size=224).shape == (600, 800, 3)
+
+
+def test_reduced_decode_is_opt_in():
+    # уменьшенное декодирование меняет разрешение всех выходов и включается только явно
+    assert not parse_args(["--config", "config.py"]).input_reduced_decode
+    assert parse_args(["--config", "config.py", "--input_reduced_decode"]).input_reduced_decode
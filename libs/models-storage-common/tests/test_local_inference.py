@@ -0,0 +1,78 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from msc.tools.inference.local_inference import LocalInference, parse_args
+from msc.utils.ioutils import DataProvider
+
+
+class FailingRunner:
+    """Runner stub: the second batch fails in the infer stage."""
+
+    def __init__(self, fail_on: int = None) -> None:
+        self.fail_on = fail_on
+        self.batches = 0
+
+    def preprocess(self, containers):
+        return containers
+
+    def __call__(self, containers):
+        self.batches += 1
+        if self.batches == self.fail_on:
+            raise RuntimeError("model failed")
+        return containers
+
+
+def make_provider(tmp_path, pipelined):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    for i in range(6):
+        cv2.imwrite(str(images_dir / f"{i}.png"), np.full((8, 8, 3), i, dtype=np.uint8))
+
+    input_args = [
+        "--config",
+        "unused.py",
+        "--input_images_dir",
+        str(images_dir),
+        "--input_manifest",
+        str(tmp_path / "manifest.json"),
+        "--input_batch_size",
+        "2",
+    ]
+    args = parse_args(input_args + (["--pipelined"] if pipelined else []))
+    args.input_lazy_draw_buffers = False
+    (provider,) = DataProvider(args).get_data()
+    return args, provider
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_manifest_is_saved_after_all_batches(tmp_path, pipelined):
+    args, provider = make_provider(tmp_path, pipelined)
+
+    batches = list(LocalInference.run_provider(args, FailingRunner(), provider))
+
+    assert sum(len(containers) for containers in batches) == 6
+    assert len(json.loads((tmp_path / "manifest.json").read_text())["files"]) == 6
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_manifest_is_not_saved_when_inference_fails(tmp_path, pipelined):
+    args, provider = make_provider(tmp_path, pipelined)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        list(LocalInference.run_provider(args, FailingRunner(fail_on=2), provider))
+
+    # необработанные изображения будут обработаны следующим запуском
+    assert not (tmp_path / "manifest.json").exists()
+
+
+def test_manifest_is_not_saved_on_early_close(tmp_path):
+    args, provider = make_provider(tmp_path, pipelined=True)
+
+    results = LocalInference.run_provider(args, FailingRunner(), provider)
+    next(results)
+    results.close()
+
+    assert not (tmp_path / "manifest.json").exists()
@@ -0,0 +1,107 @@
+import os
+
+from msc.utils.ioutils.manifest import Manifest
+
+EXTS = (".jpg",)
+
+
+def touch(path, data=b"x", mtime_ns=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime_ns is not None:
+        os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+def scan(tmp_path, root, trust=False):
+    manifest = Manifest(str(tmp_path / "manifest.json"), trust=trust).load()
+    paths = [os.path.relpath(path, str(root)) for path in manifest.scan(str(root), EXTS)]
+    manifest.save()
+    return paths, manifest
+
+
+def make_tree(root):
+    touch(root / "a.jpg")
+    touch(root / "b.JPG")
+    touch(root / "notes.txt")
+    touch(root / "sub" / "c.jpg")
+
+
+def test_first_scan_yields_all_files(tmp_path):
+    root = tmp_path / "images"
+    make_tree(root)
+
+    paths, manifest = scan(tmp_path, root)
+
+    assert paths == ["a.jpg", "b.JPG", os.path.join("sub", "c.jpg")]
+    assert manifest.stats["new"] == 3
+
+
+def test_second_scan_yields_only_new_and_changed(tmp_path):
+    root = tmp_path / "images"
+    make_tree(root)
+    scan(tmp_path, root)
+
+    touch(root / "sub" / "d.jpg")
+    touch(root / "a.jpg", data=b"changed")
+    paths, manifest = scan(tmp_path, root)
+
+    assert paths == ["a.jpg", os.path.join("sub", "d.jpg")]
+    assert manifest.stats == {"new": 1, "changed": 1, "unchanged": 2, "skipped_dirs": 0}
+
+
+def test_unsaved_scan_is_repeated(tmp_path):
+    root = tmp_path / "images"
+    make_tree(root)
+    manifest = Manifest(str(tmp_path / "manifest.json")).load()
+    list(manifest.scan(str(root), EXTS))
+
+    # прерванный запуск не сохраняет манифест, файлы обрабатываются снова
+    paths, _ = scan(tmp_path, root)
+
+    assert len(paths) == 3
+
+
+def test_trust_mode_skips_unchanged_directories(tmp_path):
+    root = tmp_path / "images"
+    make_tree(root)
+    scan(tmp_path, root)
+
+    # файл перезаписан на месте: mtime каталога не меняется
+    mtime_ns = os.stat(str(root)).st_mtime_ns
+    touch(root / "a.jpg", data=b"rewritten")
+    os.utime(str(root), ns=(mtime_ns, mtime_ns))
+    touch(root / "sub" / "d.jpg")
+
+    paths, manifest = scan(tmp_path, root, trust=True)
+
+    assert paths == [os.path.join("sub", "d.jpg")]
+    assert manifest.stats["skipped_dirs"] == 1
+    assert manifest.stats["unchanged"] == 3
+
+    # в режиме по-умолчанию перезаписанный файл находится
+    touch(root / "a.jpg", data=b"rewritten again")
+    os.utime(str(root), ns=(mtime_ns, mtime_ns))
+    paths, _ = scan(tmp_path, root)
+    assert paths == ["a.jpg"]
+
+
+def test_another_root_processes_all_files(tmp_path):
+    root = tmp_path / "images"
+    other = tmp_path / "other"
+    make_tree(root)
+    make_tree(other)
+    scan(tmp_path, root)
+
+    paths, _ = scan(tmp_path, other, trust=True)
+
+    assert len(paths) == 3
+
+
+def test_broken_manifest_processes_all_files(tmp_path):
+    root = tmp_path / "images"
+    make_tree(root)
+    (tmp_path / "manifest.json").write_text("{broken")
+
+    paths, _ = scan(tmp_path, root)
+
+    assert len(paths) == 3
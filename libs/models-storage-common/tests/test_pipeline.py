@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from msc.tools.inference.pipeline import PipelinedExecutor
+
+
+def jitter(x):
+    # later items finish earlier, so the workers complete out of order
+    time.sleep(0.001 * (x % 5))
+    return x
+
+
+def test_results_keep_source_order():
+    executor = PipelinedExecutor(stages=[("square", lambda x: x * x, 4), ("jitter", jitter, 3)], queue_size=2)
+
+    assert list(executor.run(range(50))) == [x * x for x in range(50)]
+
+
+def test_empty_source():
+    executor = PipelinedExecutor(stages=[("identity", lambda x: x, 2)])
+
+    assert list(executor.run([])) == []
+
+
+def test_stage_error_is_raised_in_caller():
+    def fail(x):
+        if x == 7:
+            raise ValueError("bad item")
+        return x
+
+    executor = PipelinedExecutor(stages=[("fail", fail, 2)], queue_size=2)
+
+    with pytest.raises(ValueError, match="bad item"):
+        list(executor.run(range(100)))
+
+
+def test_source_error_is_raised_in_caller():
+    def source():
+        yield 0
+        yield 1
+        raise RuntimeError("decode failed")
+
+    executor = PipelinedExecutor(stages=[("identity", lambda x: x, 1)])
+
+    with pytest.raises(RuntimeError, match="decode failed"):
+        list(executor.run(source()))
+
+
+def test_block_backpressure_bounds_the_source():
+    produced = []
+
+    def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    executor = PipelinedExecutor(stages=[("identity", lambda x: x, 1)], queue_size=1, backpressure="block")
+    results = executor.run(source())
+    assert next(results) == 0
+    # потребитель стоит: источник не может уйти дальше емкости очередей и элементов в обработке
+    time.sleep(0.3)
+    assert len(produced) <= 6
+    assert list(results) == list(range(1, 1000))
+
+
+def test_drop_oldest_keeps_order_and_counts_drops():
+    def slow(x):
+        time.sleep(0.005)
+        return x
+
+    executor = PipelinedExecutor(stages=[("slow", slow, 1)], queue_size=1, backpressure="drop_oldest")
+    results = list(executor.run(range(200)))
+
+    dropped = sum(stats["dropped"] for stats in executor.stats_dict())
+    assert dropped > 0
+    assert results == sorted(results)
+    assert len(results) + dropped == 200
+    # конец потока и последний элемент не выбрасываются
+    assert results[-1] == 199
+
+
+def test_early_close_stops_threads():
+    executor = PipelinedExecutor(stages=[("identity", lambda x: x, 2)], queue_size=1)
+    results = executor.run(range(1000))
+    assert next(results) == 0
+    results.close()
+
+    assert not any(thread.name.startswith("pipeline-") for thread in threading.enumerate())
+
+
+def test_unknown_backpressure_policy():
+    with pytest.raises(ValueError):
+        PipelinedExecutor(stages=[("identity", lambda x: x, 1)], backpressure="drop_newest")
+
+
+def test_single_worker_stage_gets_items_in_source_order():
+    seen = []
+
+    def record(x):
+        seen.append(x)
+        return x
+
+    executor = PipelinedExecutor(stages=[("jitter", jitter, 4), ("record", record, 1)], queue_size=2)
+
+    assert list(executor.run(range(50))) == list(range(50))
+    # после стадии с несколькими воркерами порядок восстанавливается и для однопоточной стадии
+    assert seen == list(range(50))
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from msc.models.classifiers.preprocessing import fill_letterbox_batch, letterbox_params, letterbox_resize
+
+
+@pytest.mark.parametrize("shape", [(480, 640, 3), (640, 480, 3), (100, 100, 3), (20, 50, 3), (1080, 1921, 3)])
+def test_resized_image_gives_the_same_batch(shape):
+    image = np.random.RandomState(0).randint(0, 255, shape, dtype=np.uint8)
+    full = np.empty((1, 3, 64, 64), dtype=np.float32)
+    resized = np.empty_like(full)
+
+    fill_letterbox_batch([image], full)
+    fill_letterbox_batch([letterbox_resize(image, 64)], resized)
+
+    np.testing.assert_array_equal(full, resized)
+
+
+def test_resized_image_is_not_resized_again():
+    image = letterbox_resize(np.zeros((480, 640, 3), dtype=np.uint8), 224)
+
+    assert image.shape == (168, 224, 3)
+    assert letterbox_resize(image, 224) is image
+
+
+def test_letterbox_geometry_is_stable():
+    for height in range(1, 700, 7):
+        for width in range(1, 700, 11):
+            new_h, new_w, top, left = letterbox_params(height, width, 224)
+            assert letterbox_params(new_h, new_w, 224) == (new_h, new_w, top, left)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from msc.utils.result_cache import ResultCache
+
+VALUE = "x" * 98  # 100 байт в json
+
+
+def make_cache(tmp_path, max_bytes, fingerprint=""):
+    return ResultCache(tmp_path / "cache.sqlite", max_size_mb=max_bytes / 2 ** 20, fingerprint=fingerprint)
+
+
+def test_get_put_round_trip(tmp_path):
+    cache = make_cache(tmp_path, 10000)
+    key = cache.key(np.zeros((4, 4, 3), dtype=np.uint8))
+
+    assert cache.get(key) is None
+    cache.put(key, [[1, 0.5]])
+
+    assert cache.get(key) == [[1, 0.5]]
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_key_depends_on_content_and_fingerprint(tmp_path):
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    cache = make_cache(tmp_path, 10000)
+    other = make_cache(tmp_path, 10000, fingerprint="another model")
+
+    assert cache.key(image) == cache.key(image.copy())
+    assert cache.key(image) != cache.key(np.ones_like(image))
+    assert cache.key(image) != cache.key(image.astype(np.float32))
+    assert cache.key(image) != other.key(image)
+    cache.close()
+    other.close()
+
+
+def test_eviction_removes_only_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr("msc.utils.result_cache.time.time", lambda: float(next(clock)))
+    cache = make_cache(tmp_path, 1000)
+
+    for i in range(10):
+        cache.put(bytes([i]), VALUE)
+    # обращение делает запись 0 самой свежей
+    assert cache.get(bytes([0])) == VALUE
+    cache.put(bytes([10]), VALUE)
+
+    kept = [i for i in range(11) if cache.get(bytes([i])) is not None]
+    assert kept == [0] + list(range(2, 11))
+    assert cache._size <= cache.max_bytes
+    cache.close()
+
+
+def test_size_is_restored_on_reopen(tmp_path):
+    cache = make_cache(tmp_path, 1000)
+    for i in range(5):
+        cache.put(bytes([i]), VALUE)
+    cache.close()
+
+    cache = make_cache(tmp_path, 1000)
+    assert cache._size == 500
+    assert cache.get(bytes([4])) == VALUE
+    cache.close()
+
+
+def test_overwrite_does_not_grow_the_size(tmp_path):
+    cache = make_cache(tmp_path, 1000)
+    for i in range(5):
+        cache.put(bytes([i]), VALUE)
+
+    for _ in range(20):
+        cache.put(bytes([0]), VALUE)
+    cache.put(bytes([1]), "x" * 48)
+
+    assert cache._size == 450
+    assert all(cache.get(bytes([i])) is not None for i in range(5))
+    cache.close()
@@ -0,0 +1,48 @@
+import os
+
+from msc.utils.ioutils.scanner import scan_files
+
+
+def make_tree(root):
+    for name in ("b.jpg", "a.PNG", "c.txt", "z/e.jpg", "m/d.jpg", "m/n/f.png", "m/a.jpg"):
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+
+
+def relative(paths, root):
+    return [os.path.relpath(path, str(root)) for path in paths]
+
+
+def test_sorted_depth_first_order(tmp_path):
+    make_tree(tmp_path)
+
+    paths = relative(scan_files(str(tmp_path), (".jpg", ".png")), tmp_path)
+
+    # файлы и подкаталоги каталога по имени, подкаталог обходится целиком до следующего
+    assert paths == [
+        "a.PNG",
+        "b.jpg",
+        os.path.join("m", "a.jpg"),
+        os.path.join("m", "d.jpg"),
+        os.path.join("m", "n", "f.png"),
+        os.path.join("z", "e.jpg"),
+    ]
+
+
+def test_non_recursive(tmp_path):
+    make_tree(tmp_path)
+
+    assert relative(scan_files(str(tmp_path), (".JPG",), recursive=False), tmp_path) == ["b.jpg"]
+
+
+def test_unsorted_yields_the_same_files(tmp_path):
+    make_tree(tmp_path)
+
+    assert sorted(scan_files(str(tmp_path), (".jpg", ".png"), sort=False)) == sorted(
+        scan_files(str(tmp_path), (".jpg", ".png"))
+    )
+
+
+def test_missing_root_yields_nothing(tmp_path):
+    assert list(scan_files(str(tmp_path / "missing"), (".jpg",))) == []
@@ -0,0 +1,94 @@
+import numpy as np
+
+from msc.block.gating import SceneGate
+from msc.block.gating.scene_gate import SCENE_GATE_HINT_KEY, SCENE_GATE_SOURCE_KEY
+from msc.utils.ioutils.data_provider import create_container
+from vuka.utils import Config
+
+
+def make_gate(**config):
+    return SceneGate(Config(dict(turn_on=True, signature_size=16, threshold=5.0, **config)))
+
+
+def frame(value):
+    return np.full((32, 32, 3), value, dtype=np.uint8)
+
+
+def run(gate, containers):
+    gate(containers)
+    return [container.extra.get(SCENE_GATE_SOURCE_KEY) for container in containers]
+
+
+def test_unchanged_frame_reuses_the_classified_frame():
+    gate = make_gate()
+    containers = [create_container(frame=frame(value), file_name="a.mp4") for value in (100, 101, 200, 200)]
+
+    sources = run(gate, containers)
+
+    assert sources == [None, containers[0], None, containers[2]]
+    assert (gate.gated, gate.frames) == (2, 4)
+
+
+def test_frame_is_classified_again_after_max_age():
+    gate = make_gate(max_age_frames=2)
+    containers = [create_container(frame=frame(100), file_name="a.mp4") for _ in range(7)]
+
+    sources = run(gate, containers)
+
+    assert sources == [None, containers[0], containers[0], None, containers[3], containers[3], None]
+
+
+def test_interleaved_sources_have_separate_state():
+    gate = make_gate()
+    # кадры двух видео без camera_id (камера "0") чередуются
+    containers = [
+        create_container(frame=frame(value), file_name=name)
+        for name, value in [("a.mp4", 100), ("b.mp4", 200), ("a.mp4", 100), ("b.mp4", 200), ("a.mp4", 100)]
+    ]
+
+    sources = run(gate, containers)
+
+    assert all(container.camera_id == "0" for container in containers)
+    assert sources == [None, None, containers[0], containers[1], containers[0]]
+
+
+def test_other_source_results_are_not_reused():
+    gate = make_gate()
+    containers = [create_container(frame=frame(100), file_name=name) for name in ["x.jpg", "y.jpg", "x.jpg"]]
+
+    sources = run(gate, containers)
+
+    assert sources == [None, None, containers[0]]
+
+
+def test_least_recently_used_states_are_evicted():
+    gate = make_gate(max_states=2)
+    containers = [create_container(frame=frame(100), file_name=name) for name in ["a", "b", "a", "c", "a", "b"]]
+
+    sources = run(gate, containers)
+
+    assert sources == [None, None, containers[0], None, containers[0], None]
+    assert len(gate.cameras) == 2
+
+
+def test_separate_cameras_keep_their_state():
+    gate = make_gate()
+    containers = [
+        create_container(frame=frame(100), file_name=name, camera_id=name)
+        for name in ["a.mp4", "b.mp4", "a.mp4", "b.mp4"]
+    ]
+
+    sources = run(gate, containers)
+
+    assert sources == [None, None, containers[0], containers[1]]
+
+
+def test_preprocess_hints_match_the_decision():
+    gate = make_gate(max_age_frames=2)
+    containers = [create_container(frame=frame(100), file_name="a.mp4") for _ in range(5)]
+
+    gate.preprocess(containers)
+    hints = [container.extra[SCENE_GATE_HINT_KEY] for container in containers]
+    sources = run(gate, containers)
+
+    assert hints == [source is not None for source in sources]
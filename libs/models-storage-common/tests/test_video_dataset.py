@@ -0,0 +1,121 @@
+from argparse import Namespace
+
+import cv2
+import numpy as np
+import pytest
+
+from msc.utils.ioutils.datasets import VideoDataset
+from msc.utils.ioutils.video_index import VideoIndex
+
+FRAMES = 60
+BITS = 6
+BLOCK = 16
+
+
+def encode_index(idx):
+    # индекс кадра записывается двоичным кодом из черных и белых блоков, устойчивым к сжатию
+    frame = np.zeros((BLOCK, BLOCK * BITS, 3), dtype=np.uint8)
+    for bit in range(BITS):
+        if idx >> bit & 1:
+            frame[:, bit * BLOCK : (bit + 1) * BLOCK] = 255
+    return frame
+
+
+def content_index(frame):
+    return sum(1 << bit for bit in range(BITS) if frame[:, bit * BLOCK : (bit + 1) * BLOCK].mean() > 127)
+
+
+def make_video(tmp_path, name="video.mp4", fourcc="mp4v"):
+    path = str(tmp_path / name)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 30, (BLOCK * BITS, BLOCK))
+    for i in range(FRAMES):
+        writer.write(encode_index(i))
+    writer.release()
+    return path
+
+
+def make_dataset(tmp_path, path, prefetch=0, skip_frames=None, fps=None):
+    args = Namespace(
+        input_width=None,
+        input_height=None,
+        input_skip_frames=skip_frames,
+        input_fps=fps,
+        input_prefetch=prefetch,
+        input_video_index_dir=str(tmp_path / "index"),
+    )
+    return VideoDataset(path, args)
+
+
+def read(dataset, indexes):
+    items = [dataset[idx] for idx in indexes]
+    assert all(frame is not None for frame, _ in items)
+    return [frame_index for _, frame_index in items], [content_index(frame) for frame, _ in items]
+
+
+@pytest.fixture(params=["mp4", "avi"])
+def video(request, tmp_path, monkeypatch):
+    if request.param == "avi":
+        # без индекса ключевых кадров (без PyAV): MJPG, каждый кадр ключевой
+        monkeypatch.setattr(VideoIndex, "build", classmethod(lambda cls, path: None))
+        return make_video(tmp_path, "video.avi", "MJPG")
+    return make_video(tmp_path)
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_sequential_read(tmp_path, video, prefetch):
+    dataset = make_dataset(tmp_path, video, prefetch=prefetch)
+
+    indexes, contents = read(dataset, range(len(dataset)))
+
+    assert len(dataset) == FRAMES
+    assert indexes == contents == list(range(FRAMES))
+    dataset.release()
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_skip_frames(tmp_path, video, prefetch):
+    dataset = make_dataset(tmp_path, video, prefetch=prefetch, skip_frames=7)
+
+    indexes, contents = read(dataset, range(len(dataset)))
+
+    assert len(dataset) == 9
+    assert indexes == contents == list(range(0, FRAMES, 7))
+    dataset.release()
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_fps_step(tmp_path, video, prefetch):
+    dataset = make_dataset(tmp_path, video, prefetch=prefetch, fps=10)
+
+    indexes, contents = read(dataset, range(len(dataset)))
+
+    assert dataset.step == 3
+    assert indexes == contents == list(range(0, FRAMES, 3))
+    dataset.release()
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+@pytest.mark.parametrize("skip_frames", [None, 3])
+def test_random_access(tmp_path, video, prefetch, skip_frames):
+    dataset = make_dataset(tmp_path, video, prefetch=prefetch, skip_frames=skip_frames)
+    step = skip_frames or 1
+    # переходы назад, вперед через ключевые кадры, короткие переходы и последовательные участки
+    order = [5, 0, 1, 17, 18, 19, 2, len(dataset) - 1, 9, 10, 4]
+
+    indexes, contents = read(dataset, order)
+
+    expected = [idx * step for idx in order]
+    assert indexes == contents == expected
+    dataset.release()
+
+
+def test_read_past_the_end(tmp_path, video):
+    dataset = make_dataset(tmp_path, video, prefetch=4)
+
+    read(dataset, range(len(dataset)))
+    frame, frame_index = dataset[len(dataset)]
+
+    assert frame is None
+    assert frame_index == FRAMES
+    dataset.release()
+    dataset.release()
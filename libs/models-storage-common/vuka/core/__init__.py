@@ -1,17 +1,34 @@
+from importlib import import_module
+import sys
+
 from .base_object import BaseObject
-from .bbox import BBox
+from .classification_batch import ClassificationBatch
 from .classification_object import ClassificationObject, get_classification_objects, is_classification
 from .container import Container
+from .label_table import LabelTable
 from .state import State
 from .timestamp import Timestamp
 
+# BBox тянет jsonpickle, импортируем при первом обращении
+_LAZY_ATTRIBUTES = {"BBox": "vuka.core.bbox"}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+    setattr(sys.modules[__name__], name, value)
+    return value
+
+
 __all__ = [
-    BBox,
     Timestamp,
     BaseObject,
     State,
     Container,
     ClassificationObject,
+    ClassificationBatch,
+    LabelTable,
     is_classification,
     get_classification_objects,
 ]
@@ -3,8 +3,43 @@ import uuid
 
 
 class BaseObject:
+    """Base of the vuka objects.
+
+    Fields are kept in __slots__, uuid and zones are created on the first access. The pickled state and
+    serialization_to_json keep the keys of the former __dict__ based objects.
+    """
+
+    __slots__ = (
+        "_uuid",
+        "objects",
+        "violator",
+        "image_name",
+        "camera_id",
+        "detection_count",
+        "image",
+        "image_draw",
+        "current_timestamp",
+        "_zones",
+        "_type",
+    )
+
+    # ключ состояния -> атрибут. Ключи совпадают с __dict__ прежних версий объектов
+    _STATE_FIELDS = (
+        ("uuid", "uuid"),
+        ("objects", "objects"),
+        ("violator", "violator"),
+        ("image_name", "image_name"),
+        ("camera_id", "camera_id"),
+        ("detection_count", "detection_count"),
+        ("image", "image"),
+        ("image_draw", "image_draw"),
+        ("current_timestamp", "current_timestamp"),
+        ("zones", "zones"),
+        ("_type", "_type"),
+    )
+
     def __init__(self):
-        self.uuid = str(uuid.uuid4())
+        self._uuid = None
         self.objects = []
         self.violator = False
         self.image_name = None
@@ -13,11 +48,44 @@ class BaseObject:
         self.image = None
         self.image_draw = None
         self.current_timestamp = time.time()
-        self.zones = set()
+        self._zones = None
         self._type = "base_object"
 
+    @property
+    def uuid(self) -> str:
+        if self._uuid is None:
+            self._uuid = str(uuid.uuid4())
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, value) -> None:
+        self._uuid = value
+
+    @property
+    def zones(self) -> set:
+        if self._zones is None:
+            self._zones = set()
+        return self._zones
+
+    @zones.setter
+    def zones(self, value) -> None:
+        self._zones = value
+
+    def __getstate__(self):
+        state = {key: getattr(self, attr) for key, attr in self._STATE_FIELDS}
+        # наследники без __slots__ (State и др.) хранят свои атрибуты в __dict__
+        state.update(getattr(self, "__dict__", {}))
+        return state
+
+    def __setstate__(self, state):
+        self._uuid = None
+        self._zones = None
+        attrs = dict(self._STATE_FIELDS)
+        for key, value in state.items():
+            setattr(self, attrs.get(key, key), value)
+
     def serialization_to_json(self):
-        return dict(self.__dict__)
+        return self.__getstate__()
 
     @property
     def type(self):
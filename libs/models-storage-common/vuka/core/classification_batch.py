@@ -0,0 +1,140 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from vuka.core.classification_object import ClassificationObject
+from vuka.core.label_table import LabelTable
+
+
+class ClassificationBatch:
+    """Classification results of a batch of containers in columnar form.
+
+    One row per kept prediction, rows are grouped by container and sorted by score inside a group. ClassificationObject
+    instances are created only by objects(index), consumers work with the arrays directly.
+
+        Args:
+            container_index: (P,) index of the container in the batch.
+            label_id: (P,) label ids.
+            score: (P,) scores.
+            labels: label table of the model, names are resolved only for display and serialization.
+            size: number of containers in the batch.
+            top_k_label_id: optional (size, k) label ids of the top-k predictions before the threshold, -1 - no
+                inference for the container.
+            top_k_score: optional (size, k) scores of the top-k predictions, nan - no inference for the container.
+    """
+
+    __slots__ = ("container_index", "label_id", "score", "labels", "size", "top_k_label_id", "top_k_score", "_offsets")
+
+    def __init__(
+        self,
+        container_index: np.ndarray,
+        label_id: np.ndarray,
+        score: np.ndarray,
+        labels: LabelTable,
+        size: int,
+        top_k_label_id: Optional[np.ndarray] = None,
+        top_k_score: Optional[np.ndarray] = None,
+    ) -> None:
+        self.container_index = np.asarray(container_index, dtype=np.int32)
+        self.label_id = np.asarray(label_id, dtype=np.int32)
+        self.score = np.asarray(score, dtype=np.float32)
+        self.labels = labels
+        self.size = int(size)
+        self.top_k_label_id = top_k_label_id
+        self.top_k_score = top_k_score
+        # начало строк каждого контейнера: строки контейнера index - [offsets[index], offsets[index + 1])
+        self._offsets = np.searchsorted(self.container_index, np.arange(self.size + 1))
+
+    @classmethod
+    def from_top_k(
+        cls,
+        top_scores: np.ndarray,
+        top_ids: np.ndarray,
+        keep: np.ndarray,
+        labels: LabelTable,
+        rows: Optional[Sequence[int]] = None,
+        size: Optional[int] = None,
+        predictions: Optional[Dict[int, Sequence]] = None,
+    ) -> "ClassificationBatch":
+        """Builds the batch from (N, k) model outputs.
+
+        Args:
+            top_scores: (N, k) scores sorted in descending order.
+            top_ids: (N, k) label ids.
+            keep: (N, k) boolean mask of predictions to keep.
+            labels: label table of the model.
+            rows: container index of each of the N outputs, by default 0..N-1.
+            size: number of containers in the batch, by default N.
+            predictions: results of containers without model outputs (cache hits), {index: [(label_id, score)]}.
+        """
+        rows = np.arange(len(top_scores)) if rows is None else np.asarray(rows, dtype=np.int64)
+        size = len(top_scores) if size is None else size
+        k = top_scores.shape[1] if top_scores.ndim == 2 else 0
+
+        top_k_label_id = np.full((size, k), -1, dtype=np.int32)
+        top_k_score = np.full((size, k), np.nan, dtype=np.float32)
+        if len(rows) > 0:
+            top_k_label_id[rows] = top_ids
+            top_k_score[rows] = top_scores
+
+        output_i, column = np.nonzero(keep)
+        container_index = [rows[output_i]]
+        label_id = [top_ids[output_i, column]]
+        score = [top_scores[output_i, column]]
+        for index, items in (predictions or {}).items():
+            container_index.append(np.full(len(items), index))
+            label_id.append([label for label, _ in items])
+            score.append([value for _, value in items])
+
+        container_index = np.concatenate(container_index).astype(np.int32)
+        # устойчивая сортировка сохраняет порядок по score внутри контейнера
+        order = np.argsort(container_index, kind="stable")
+        return cls(
+            container_index[order],
+            np.concatenate(label_id).astype(np.int32)[order],
+            np.concatenate(score).astype(np.float32)[order],
+            labels,
+            size,
+            top_k_label_id=top_k_label_id,
+            top_k_score=top_k_score,
+        )
+
+    def __len__(self) -> int:
+        return len(self.label_id)
+
+    def rows(self, index: int) -> slice:
+        """Rows of the container index."""
+        return slice(int(self._offsets[index]), int(self._offsets[index + 1]))
+
+    def label_names(self, index: Optional[int] = None) -> np.ndarray:
+        """Label names of the container rows or of all rows."""
+        label_id = self.label_id if index is None else self.label_id[self.rows(index)]
+        return self.labels[label_id]
+
+    def predictions(self, index: int) -> List[tuple]:
+        """[(label_id, score)] of the container."""
+        rows = self.rows(index)
+        return list(zip(self.label_id[rows].tolist(), self.score[rows].tolist()))
+
+    def records(self, index: int) -> List[Dict]:
+        """json-serializable records of the container predictions."""
+        rows = self.rows(index)
+        return [
+            {"type": "classification", "label": label, "score": score}
+            for label, score in zip(self.labels[self.label_id[rows]].tolist(), self.score[rows].tolist())
+        ]
+
+    def objects(self, index: int) -> List[ClassificationObject]:
+        """ClassificationObject views of the container predictions."""
+        rows = self.rows(index)
+        return [
+            ClassificationObject(score=score, label_id=label_id, label_table=self.labels)
+            for label_id, score in zip(self.label_id[rows].tolist(), self.score[rows].tolist())
+        ]
+
+    def label_counts(self) -> np.ndarray:
+        """Number of predictions of every label id."""
+        return np.bincount(self.label_id, minlength=len(self.labels))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(size={self.size}, predictions={len(self)})"
@@ -2,42 +2,81 @@ import logging
 from typing import Any, List
 
 from vuka.core import BaseObject
+from vuka.core.label_table import LabelTable
 from vuka.utils import is_vuka_object
 
 
 class ClassificationObject(BaseObject):
     """Provides an interface for working with objects in the tasks of classification objects.
 
+    The label is given by the name or by the label id in the shared label table, the name of the id is resolved on
+    the first access of label (display, serialization).
+
         Args:
             score: Classifier score.
             label: Classifier label.
+            label_id: Label id in label_table.
+            label_table: Label table of the model.
     """
 
-    def __init__(self, score: float, label: str) -> None:
+    __slots__ = ("_score", "_label", "label_id", "label_table")
+
+    # прежние ключи состояния - имена с name mangling
+    _STATE_FIELDS = BaseObject._STATE_FIELDS + (
+        ("_ClassificationObject__score", "score"),
+        ("_ClassificationObject__label", "label"),
+        ("label_id", "label_id"),
+    )
+
+    def __init__(self, score: float, label: str = None, label_id: int = None, label_table: LabelTable = None) -> None:
         super(ClassificationObject, self).__init__()
         self.score: float = score
-        self.label: str = label
+        self.label_table = label_table
+        self._label = None
+        self.label_id = None
+        if label_id is None or label is not None:
+            self.label: str = label
+        if label_id is not None:
+            if label_table is None:
+                raise TypeError("label_id requires label_table")
+            self.label_id = label_id
         self._type: str = "classification"
 
     @property
     def score(self) -> float:
-        return self.__score
+        return self._score
 
     @score.setter
     def score(self, score) -> None:
         if not isinstance(score, float):
             raise TypeError("score must be float object")
-        self.__score = score
+        self._score = score
 
     @property
     def label(self) -> str:
-        return self.__label
+        if self._label is None and self.label_id is not None:
+            self._label = self.label_table.name(self.label_id)
+        return self._label
 
     @label.setter
     def label(self, label) -> None:
         if not isinstance(label, str):
             raise TypeError("label must be string object")
-        self.__label = label
+        self._label = label
+        # id имени в таблице модели, имена вне таблицы остаются без id
+        self.label_id = None
+        if self.label_table is not None:
+            try:
+                self.label_id = self.label_table.id(label)
+            except KeyError:
+                pass
+
+    def __setstate__(self, state):
+        # таблица меток не сохраняется, имя метки есть в состоянии
+        self.label_table = None
+        self.label_id = None
+        self._label = None
+        super(ClassificationObject, self).__setstate__(state)
 
 
 def is_classification(obj: Any) -> bool:
@@ -1,7 +1,72 @@
-from vuka.core.timestamp import Timestamp
+import datetime
+import threading
+import time
+
+# буфер отрисовки еще не скопирован из draw source
+_LAZY = object()
+_DRAW_BUFFERS = ("image_draw", "image_draw_zone")
 
 
 class Container:
+    """Frame and results passed through the blocks pipeline.
+
+    Draw buffers (image_draw, image_draw_zone) set by set_draw_source are copies of the source frame made on the first
+    access, so frames which are never drawn on are not copied. In-place writes to the source before that access are
+    visible in the copies, so the source must not be mutated (no block draws on container.image). Explicitly assigned
+    buffers are kept as is.
+
+    Fields are kept in __slots__, the timestamp string, extra and filtration_parameters_by_size are created on the first
+    access. Attributes set by blocks outside of the fields (BaseBlock.set_output) go to __dict__.
+
+    Classifiers attach columnar ClassificationBatch results (add_classification), objects creates ClassificationObject
+    views of them on the first access. Consumers which read pending_classifications do not create the views.
+    """
+
+    __slots__ = (
+        "file_name",
+        "frame_index",
+        "camera_id",
+        "camera_name",
+        "width",
+        "height",
+        "editable_config",
+        "image",
+        "_draw_source",
+        "_image_draw",
+        "_image_draw_zone",
+        "_created",
+        "_timestamp",
+        "_extra",
+        "_filtration_parameters_by_size",
+        "_objects",
+        "_classifications",
+        "_materialized",
+        "__dict__",
+    )
+
+    # поля состояния в порядке прежнего __dict__
+    _STATE_FIELDS = (
+        "file_name",
+        "frame_index",
+        "camera_id",
+        "camera_name",
+        "width",
+        "height",
+        "editable_config",
+        "image",
+        "_draw_source",
+        "image_draw",
+        "image_draw_zone",
+        "timestamp",
+        "extra",
+        "filtration_parameters_by_size",
+        "objects",
+    )
+
+    # счетчики буферов отрисовки по всем контейнерам процесса
+    _draw_lock = threading.Lock()
+    _draw_counters = {"deferred": 0, "materialized": 0, "deferred_bytes": 0, "materialized_bytes": 0}
+
     def __init__(self, image=None, **kwargs):
         self.file_name = kwargs.get("file_name")  # None  # Input
         self.frame_index = kwargs.get("frame_index")  # Input
@@ -11,26 +76,127 @@ class Container:
         self.height = kwargs.get("height")  # Input
         self.editable_config = kwargs.get("editable_config")  # Input
         self.image = image  # Input
+        self._draw_source = None
         self.image_draw = kwargs.get("image_draw")  # Input/Output
         self.image_draw_zone = kwargs.get("image_draw_zone")  # Input/Output
-        self.timestamp = Timestamp().timestamp.isoformat()
-        self.extra = {}  # для нечетких связей
+        # строка времени в UTC формируется при первом обращении
+        self._created = time.time()
+        self._timestamp = None
+        self._extra = None  # для нечетких связей
+        self._filtration_parameters_by_size = kwargs.get("filtration_parameters_by_size")
 
-        if kwargs.get("filtration_parameters_by_size") is not None:
-            self.filtration_parameters_by_size = kwargs.get("filtration_parameters_by_size")
-        else:
-            self.filtration_parameters_by_size = []
+        # результаты классификаторов (batch, index), первые materialized из них уже добавлены в objects
+        self._classifications = []
+        self._materialized = 0
 
         if kwargs.get("objects") is not None:
             self.objects = kwargs.get("objects")
         else:
             self.objects = []  # Output
 
+    def set_draw_source(self, image) -> None:
+        """Draw buffers become copies of image made on the first access, image must not be changed in place."""
+        self._draw_source = image
+        self._image_draw = _LAZY
+        self._image_draw_zone = _LAZY
+        if image is not None:
+            with self._draw_lock:
+                self._draw_counters["deferred"] += len(_DRAW_BUFFERS)
+                self._draw_counters["deferred_bytes"] += len(_DRAW_BUFFERS) * image.nbytes
+
+    def _draw_buffer(self, name: str):
+        buffer = getattr(self, name)
+        if buffer is _LAZY:
+            buffer = None
+            if self._draw_source is not None:
+                buffer = self._draw_source.copy()
+                with self._draw_lock:
+                    self._draw_counters["materialized"] += 1
+                    self._draw_counters["materialized_bytes"] += buffer.nbytes
+            setattr(self, name, buffer)
+        return buffer
+
+    @property
+    def image_draw(self):
+        return self._draw_buffer("_image_draw")
+
+    @image_draw.setter
+    def image_draw(self, value):
+        self._image_draw = value
+
+    @property
+    def image_draw_zone(self):
+        return self._draw_buffer("_image_draw_zone")
+
+    @image_draw_zone.setter
+    def image_draw_zone(self, value):
+        self._image_draw_zone = value
+
+    def is_draw_materialized(self, name: str = "image_draw") -> bool:
+        """Whether the draw buffer exists, checking does not copy the source frame."""
+        return getattr(self, f"_{name}") is not _LAZY
+
+    @property
+    def timestamp(self) -> str:
+        if self._timestamp is None:
+            created = datetime.datetime.fromtimestamp(self._created, datetime.timezone.utc)
+            self._timestamp = created.replace(tzinfo=None).isoformat()
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value) -> None:
+        self._timestamp = value
+
+    @property
+    def extra(self) -> dict:
+        if self._extra is None:
+            self._extra = {}
+        return self._extra
+
+    @extra.setter
+    def extra(self, value) -> None:
+        self._extra = value
+
+    @property
+    def filtration_parameters_by_size(self) -> list:
+        if self._filtration_parameters_by_size is None:
+            self._filtration_parameters_by_size = []
+        return self._filtration_parameters_by_size
+
+    @filtration_parameters_by_size.setter
+    def filtration_parameters_by_size(self, value) -> None:
+        self._filtration_parameters_by_size = value
+
+    @classmethod
+    def draw_buffer_stats(cls) -> dict:
+        """Deferred and actually made draw buffer copies, saved_bytes - copies which were never made."""
+        with cls._draw_lock:
+            stats = dict(cls._draw_counters)
+        stats["saved_bytes"] = stats["deferred_bytes"] - stats["materialized_bytes"]
+        return stats
+
     def __getstate__(self):
-        return vars(self)
+        # состояние в прежнем формате: не скопированные буферы сохраняются как None и остаются ленивыми
+        state = {}
+        lazy = []
+        for name in self._STATE_FIELDS:
+            if name in _DRAW_BUFFERS and not self.is_draw_materialized(name):
+                lazy.append(name)
+                state[name] = None
+            else:
+                state[name] = getattr(self, name)
+        state["_lazy_draw_buffers"] = lazy
+        state.update(vars(self))
+        return state
 
     def __setstate__(self, state):
-        vars(self).update(state)
+        state = dict(state)
+        lazy = state.pop("_lazy_draw_buffers", [])
+        Container.__init__(self)
+        for name, value in state.items():
+            setattr(self, name, value)
+        for name in lazy:
+            setattr(self, f"_{name}", _LAZY)
 
     # # Только для неопределенных атрибутов
     # def __getattr__(self, attr) -> None:
@@ -50,12 +216,42 @@ class Container:
             self.height,
             self.editable_config,
             self.image,
-            self.image_draw,
-            self.image_draw_zone,
+            self.image_draw if self.is_draw_materialized("image_draw") else "<lazy>",
+            self.image_draw_zone if self.is_draw_materialized("image_draw_zone") else "<lazy>",
             self.objects,
         )
         return repr_str
 
+    @property
+    def objects(self) -> list:
+        if self._materialized < len(self._classifications):
+            for batch, index in self._classifications[self._materialized :]:
+                for obj in batch.objects(index):
+                    obj.camera_id = self.camera_id
+                    self._objects.append(obj)
+            self._materialized = len(self._classifications)
+        return self._objects
+
+    @objects.setter
+    def objects(self, value) -> None:
+        # присвоенный список заменяет и еще не созданные объекты классификаторов
+        self._objects = value
+        self._materialized = len(self._classifications)
+
+    @property
+    def materialized_objects(self) -> list:
+        """Objects without the views of pending classifications."""
+        return self._objects
+
+    @property
+    def pending_classifications(self) -> list:
+        """[(ClassificationBatch, index)] results which are not in materialized_objects yet."""
+        return self._classifications[self._materialized :]
+
+    def add_classification(self, batch, index: int) -> None:
+        """Attaches the results of the container (row index of the batch) without creating objects."""
+        self._classifications.append((batch, index))
+
     def add_obj(self, obj):
         obj.camera_id = self.camera_id
         self.objects.append(obj)
@@ -0,0 +1,58 @@
+import sys
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+
+class LabelTable:
+    """Immutable label id -> name table shared by a model and all its results.
+
+    Names are kept in a read-only NumPy object array of interned strings: indexing by an id or an array of ids returns
+    the same string objects without copying. The name -> id mapping is built on the first lookup.
+
+        Args:
+            names: label names, the position is the label id.
+    """
+
+    __slots__ = ("names", "_ids")
+
+    def __init__(self, names: Sequence[Optional[str]]) -> None:
+        names = np.array([sys.intern(str(name)) if name is not None else None for name in names], dtype=object)
+        names.setflags(write=False)
+        object.__setattr__(self, "names", names)
+        object.__setattr__(self, "_ids", None)
+
+    @classmethod
+    def from_mapping(cls, labels: Dict[int, str]) -> "LabelTable":
+        """Table of a {label_id: name} mapping, missing ids have None names."""
+        names = [None] * (max(labels.keys()) + 1 if len(labels) > 0 else 0)
+        for label_id, name in labels.items():
+            names[label_id] = name
+        return cls(names)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, label_id: Union[int, np.ndarray]):
+        return self.names[label_id]
+
+    def name(self, label_id: int) -> Optional[str]:
+        return self.names[label_id]
+
+    def id(self, name: str) -> int:
+        """Label id of the name, KeyError for unknown names."""
+        if self._ids is None:
+            object.__setattr__(self, "_ids", {name: i for i, name in enumerate(self.names) if name is not None})
+        return self._ids[name]
+
+    def ids(self, names: Iterable[str]) -> np.ndarray:
+        return np.array([self.id(name) for name in names], dtype=np.int32)
+
+    def __reduce__(self):
+        return self.__class__, (self.names.tolist(),)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(size={len(self)})"
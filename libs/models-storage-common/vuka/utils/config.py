@@ -1,7 +1,7 @@
 # https://raw.githubusercontent.com/qijiezhao/M2Det/master/configs/CC.py
 
 from argparse import ArgumentParser
-from collections import Iterable
+from collections.abc import Iterable
 from importlib import import_module
 import os.path as osp
 import pickle